@@ -0,0 +1,42 @@
+"""
+get()의 hit/miss 횟수를 기록하는 cache backend (프로세스별)
+"""
+import threading
+
+from django.core.cache.backends.filebased import FileBasedCache as BaseFileBasedCache
+
+try:
+    # Django의 RedisCache는 redis-py를 사용할때 import하므로 미리 확인
+    import redis  # noqa: F401
+    from django.core.cache.backends.redis import RedisCache as BaseRedisCache
+except ImportError:
+    # Django 4.0 미만이거나 redis-py가 없는 경우
+    BaseRedisCache = None
+
+CACHE_STATS = {'hits': 0, 'misses': 0}
+_lock = threading.Lock()
+_missing = object()
+
+
+def cache_stats():
+    total = CACHE_STATS['hits'] + CACHE_STATS['misses']
+    return dict(CACHE_STATS, hit_rate=CACHE_STATS['hits'] / total if total else None)
+
+
+class CacheStatsMixin:
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        with _lock:
+            CACHE_STATS['misses' if value is _missing else 'hits'] += 1
+        return default if value is _missing else value
+
+
+class FileBasedCache(CacheStatsMixin, BaseFileBasedCache):
+    pass
+
+
+if BaseRedisCache is not None:
+    class RedisCache(CacheStatsMixin, BaseRedisCache):
+        pass
+else:
+    RedisCache = None
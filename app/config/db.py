@@ -0,0 +1,72 @@
+"""
+DB 연결 관리
+
+- persistent connection (CONN_MAX_AGE) + 재사용 전 health check (CONN_HEALTH_CHECKS)
+- 선택적으로 프로세스 내 connection pool (Django 5.1+, psycopg 3)
+  크기는 gunicorn worker/thread 수와 프로젝트별 최대 연결 수(DB_MAX_CONNECTIONS)로 결정
+- 연결 생성/재사용 횟수
+"""
+import os
+import threading
+
+GUNICORN_WORKERS = int(os.environ.get('GUNICORN_WORKERS', 1))
+GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 1))
+DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 0))
+DB_POOL = os.environ.get('DJANGO_DB_POOL') == '1'
+
+
+def configure_databases(databases, conn_max_age=600, pool=DB_POOL, max_connections=DB_MAX_CONNECTIONS):
+    configured = {}
+    for alias, database in databases.items():
+        database = dict(database)
+        if pool and 'postgresql' in database['ENGINE']:
+            # pool은 worker 프로세스마다 생성되므로 프로젝트 전체의 최대 연결 수를 worker 수로 나눔
+            max_size = GUNICORN_THREADS
+            if max_connections:
+                max_size = max(1, min(max_size, max_connections // GUNICORN_WORKERS))
+            database['OPTIONS'] = dict(
+                database.get('OPTIONS', {}),
+                pool={'min_size': 1, 'max_size': max_size, 'timeout': 10},
+            )
+            # pool을 사용하면 Django의 persistent connection은 사용할 수 없음
+            database['CONN_MAX_AGE'] = 0
+        else:
+            # thread별로 최대 1개의 연결을 유지 (workers * threads <= DB_MAX_CONNECTIONS는 container.py에서 맞춤)
+            database.setdefault('CONN_MAX_AGE', conn_max_age)
+        database.setdefault('CONN_HEALTH_CHECKS', True)
+        configured[alias] = database
+    return configured
+
+
+class ConnectionStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    def on_connection_created(self, sender, connection, **kwargs):
+        with self.lock:
+            self.opened += 1
+
+    def on_request_started(self, sender, **kwargs):
+        from django.db import connections
+
+        # 요청 시작시 이미 열려있는 연결은 이전 요청의 연결을 재사용
+        reused = sum(1 for connection in connections.all() if connection.connection is not None)
+        if reused:
+            with self.lock:
+                self.reused += reused
+
+    def as_dict(self):
+        return {'opened': self.opened, 'reused': self.reused}
+
+
+CONNECTION_STATS = ConnectionStats()
+
+
+def install_connection_stats():
+    from django.core.signals import request_started
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(CONNECTION_STATS.on_connection_created, dispatch_uid='connection_stats')
+    request_started.connect(CONNECTION_STATS.on_request_started, dispatch_uid='connection_stats')
@@ -0,0 +1,100 @@
+"""
+Health check
+
+- liveness (/health/): Django(middleware, URL dispatch)를 거치지 않고 WSGI 단계에서 바로 응답
+  EB/ALB의 health check는 이쪽을 사용
+- readiness (/health/ready/): DB, cache, secret을 확인하고 결과를 HEALTH_STALENESS초 동안 재사용
+"""
+import json
+import os
+import threading
+import time
+
+HEALTH_STALENESS = float(os.environ.get('HEALTH_STALENESS', 10))
+LIVENESS_PATH = '/health/'
+READINESS_PATH = '/health/ready/'
+
+
+def check_database():
+    from django.db import connections
+
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+
+def check_cache():
+    from django.core.cache import cache
+
+    cache.set('health-check', 1, 10)
+    if cache.get('health-check') != 1:
+        raise Exception('cache set/get 실패')
+
+
+def check_secrets():
+    from secrets_cache import SECRETS_CACHE
+
+    SECRETS_CACHE.get()
+
+
+CHECKS = {
+    'database': check_database,
+    'cache': check_cache,
+    'secrets': check_secrets,
+}
+
+
+class HealthCheckMiddleware:
+    def __init__(self, application, staleness=HEALTH_STALENESS):
+        self.application = application
+        self.staleness = staleness
+        self.lock = threading.Lock()
+        self.readiness_result = None
+        self.readiness_checked_at = 0
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path == LIVENESS_PATH:
+            return self.respond(start_response, 200, {'status': 'ok'})
+        if path == READINESS_PATH:
+            ready, result = self.readiness()
+            return self.respond(start_response, 200 if ready else 503, result)
+        return self.application(environ, start_response)
+
+    @staticmethod
+    def respond(start_response, status, body):
+        content = json.dumps(body).encode()
+        start_response(f'{status} {"OK" if status == 200 else "Service Unavailable"}', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(content))),
+            ('Cache-Control', 'no-store'),
+        ])
+        return [content]
+
+    def readiness(self):
+        with self.lock:
+            if self.readiness_result and time.monotonic() - self.readiness_checked_at < self.staleness:
+                return self.readiness_result
+
+            from config.cache import cache_stats
+            from config.db import CONNECTION_STATS
+
+            checks, ready = {}, True
+            for name, check in CHECKS.items():
+                started_at = time.perf_counter()
+                try:
+                    check()
+                    checks[name] = {'status': 'ok'}
+                except Exception as e:
+                    ready = False
+                    checks[name] = {'status': 'error', 'error': str(e)}
+                checks[name]['ms'] = round((time.perf_counter() - started_at) * 1000, 1)
+
+            self.readiness_result = (ready, {
+                'status': 'ok' if ready else 'error',
+                'checks': checks,
+                'connections': CONNECTION_STATS.as_dict(),
+                'cache': cache_stats(),
+            })
+            self.readiness_checked_at = time.monotonic()
+            return self.readiness_result
@@ -1,11 +1,17 @@
 import os
-from aws_secrets import SECRETS
+import sys
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 ROOT_DIR = os.path.dirname(BASE_DIR)
 TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
 
+# eb-deploy-base의 secrets_cache
+#  로컬에서는 이 저장소의 root, 컨테이너(/srv/{project})에서는 PYTHONPATH의 /srv/project
+#  (gunicorn pythonpath, celery program environment, container.py가 실행하는 명령의 env)
+sys.path.append(os.path.dirname(ROOT_DIR))
+from secrets_cache import SECRETS_CACHE  # noqa: E402
+
 # Config
 ALLOWED_HOSTS = []
 
@@ -21,15 +27,14 @@ STATICFILES_DIRS = [
     STATIC_DIR,
 ]
 
-# django-aws-secrets-manager
-AWS_SECRETS_MANAGER_SECRETS_NAME = 'lhy'
-AWS_SECRETS_MANAGER_PROFILE = 'lhy-secrets-manager'
+# Secrets (secret 'lhy'의 section, 프로세스당 한 번만 가져옴)
 AWS_SECRETS_MANAGER_SECRETS_SECTION = 'eb-deploy-base:base'
-AWS_SECRETS_MANAGER_REGION_NAME = 'ap-northeast-2'
-
-# Secrets
+SECRETS = SECRETS_CACHE.section(AWS_SECRETS_MANAGER_SECRETS_SECTION)
 SECRET_KEY = SECRETS['SECRET_KEY']
-DATABASES = SECRETS['DATABASES']
+
+# Database (persistent connection, health check, 선택적으로 pool)
+from config.db import configure_databases  # noqa: E402
+DATABASES = configure_databases(SECRETS['DATABASES'])
 
 # Application definition
 INSTALLED_APPS = [
@@ -2,5 +2,6 @@ from .base import *
 
 DEBUG = True
 AWS_SECRETS_MANAGER_SECRETS_SECTION = 'eb-deploy-base:dev'
+SECRETS = SECRETS_CACHE.section(AWS_SECRETS_MANAGER_SECRETS_SECTION)
 ALLOWED_HOSTS += ['*']
 WSGI_APPLICATION = 'config.wsgi.dev.application'
@@ -1,5 +1,85 @@
+import os
+
+import django
+
 from .base import *
 
 AWS_SECRETS_MANAGER_SECRETS_SECTION = 'eb-deploy-base:production'
+SECRETS = SECRETS_CACHE.section(AWS_SECRETS_MANAGER_SECRETS_SECTION)
 ALLOWED_HOSTS += SECRETS['ALLOWED_HOSTS']
 WSGI_APPLICATION = 'config.wsgi.production.application'
+
+# Logging (요청 처리 thread는 queue에 넣기만 하고 파일 쓰기는 별도 thread에서)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'log_handlers.JsonFormatter'},
+    },
+    'handlers': {
+        'file': {
+            'class': 'log_handlers.QueueFileHandler',
+            'filename': f'/var/log/gunicorn/{os.path.basename(os.path.dirname(ROOT_DIR))}-django.log',
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'django': {'handlers': ['file'], 'level': 'WARNING'},
+        'celery': {'handlers': ['file'], 'level': 'WARNING'},
+    },
+}
+
+# Celery (container.py가 생성하는 supervisor program의 environment로 profile별 값 전달)
+#  broker는 supervisord가 실행하는 redis를 공유하고, 프로젝트 이름의 queue를 사용
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL') or 'redis+socket:///tmp/redis.sock'
+CELERY_TASK_DEFAULT_QUEUE = os.path.basename(os.path.dirname(ROOT_DIR))
+CELERY_TASK_ACKS_LATE = os.environ.get('CELERY_TASK_ACKS_LATE') == '1'
+CELERY_TASK_REJECT_ON_WORKER_LOST = CELERY_TASK_ACKS_LATE
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.environ.get('CELERY_WORKER_PREFETCH_MULTIPLIER', 4))
+
+# Static (content hash가 포함된 파일명, nginx에서 오래 캐시)
+if django.VERSION >= (4, 2):
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'},
+    }
+else:
+    STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'
+
+# Cache (DJANGO_CACHE_PROFILE)
+#  redis: supervisord가 실행하는 redis의 unix socket을 모든 프로젝트/worker가 공유
+#         (Django 4.0 이상, redis-py가 설치된 경우만 사용할 수 있고 아니면 file)
+#  file: 같은 프로젝트의 worker끼리 공유하는 파일 캐시 (기본값)
+#  off: Django 기본값 (worker별 LocMem)
+from config.cache import RedisCache  # noqa: E402
+
+CACHE_PROFILE = os.environ.get('DJANGO_CACHE_PROFILE') or 'file'
+if CACHE_PROFILE == 'redis' and RedisCache is None:
+    CACHE_PROFILE = 'file'
+CACHE_KEY_PREFIX = os.path.basename(os.path.dirname(ROOT_DIR))
+if CACHE_PROFILE == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'config.cache.RedisCache',
+            'LOCATION': 'unix:///tmp/redis.sock',
+            'KEY_PREFIX': CACHE_KEY_PREFIX,
+        }
+    }
+elif CACHE_PROFILE == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'config.cache.FileBasedCache',
+            'LOCATION': os.path.join('/tmp', 'django-cache', CACHE_KEY_PREFIX),
+        }
+    }
+if CACHE_PROFILE != 'off':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+    # 컴파일된 템플릿을 worker 메모리에 유지
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
@@ -6,4 +6,5 @@ from . import views
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.IndexView.as_view(), name='index'),
+    path('cache-stats/', views.CacheStatsView.as_view(), name='cache-stats'),
 ]
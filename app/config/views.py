@@ -1,5 +1,19 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.cache import cache_page
 from django.views.generic import TemplateView
 
+from .cache import cache_stats
 
+
+@method_decorator(cache_page(60 * 15), name='dispatch')
 class IndexView(TemplateView):
     template_name = 'index.html'
+
+
+@method_decorator(staff_member_required, name='dispatch')
+class CacheStatsView(View):
+    def get(self, request):
+        return JsonResponse(cache_stats())
@@ -1,7 +1,62 @@
+import gc
 import os
+from importlib import import_module
+from importlib.util import find_spec
 
 from django.core.wsgi import get_wsgi_application
 
+from config.db import install_connection_stats
+from config.health import HealthCheckMiddleware
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.production')
 
-application = get_wsgi_application()
+# /health/는 Django를 거치지 않고 바로 응답
+application = HealthCheckMiddleware(get_wsgi_application())
+install_connection_stats()
+
+
+def warm_up():
+    """
+    gunicorn preload_app 사용시 master에서 fork하기 전에 앱 전체를 로드
+    worker는 fork된 메모리를 copy-on-write로 공유하므로 worker별 import/초기화 비용과 메모리가 줄어듦
+    """
+    from django.apps import apps
+    from django.db import connections
+    from django.template import TemplateSyntaxError, engines
+    from django.template.utils import get_app_template_dirs
+    from django.urls import get_resolver
+
+    # INSTALLED_APPS의 모듈 (models, admin은 django.setup()에서 로드됨)
+    for app_config in apps.get_app_configs():
+        for name in ('urls', 'views', 'forms', 'serializers', 'signals', 'tasks'):
+            module = f'{app_config.name}.{name}'
+            if find_spec(module) is not None:
+                import_module(module)
+
+    # URL resolver (urlconf import 및 reverse용 딕셔너리 생성)
+    get_resolver()._populate()
+
+    # 템플릿 컴파일 (cached loader인 경우 컴파일된 템플릿이 유지됨)
+    for engine in engines.all():
+        template_dirs = list(getattr(engine, 'dirs', [])) + list(get_app_template_dirs('templates'))
+        for template_dir in template_dirs:
+            for dirpath, dirnames, filenames in os.walk(template_dir):
+                for filename in filenames:
+                    if not filename.endswith(('.html', '.txt')):
+                        continue
+                    name = os.path.relpath(os.path.join(dirpath, filename), template_dir)
+                    try:
+                        engine.get_template(name)
+                    except TemplateSyntaxError:
+                        pass
+
+    # fork된 worker들이 master의 DB 연결을 공유하지 않도록 닫음
+    connections.close_all()
+
+    # 이후 GC가 공유 객체의 refcount/헤더를 수정해서 페이지가 복사되지 않도록 고정
+    gc.collect()
+    gc.freeze()
+
+
+if os.environ.get('DJANGO_PRELOAD') == '1':
+    warm_up()
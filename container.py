@@ -1,83 +1,1599 @@
 #!/usr/bin/env python
 import argparse
+import gzip
+import hashlib
+import http.client
+import json
 import os
+import re
+import resource
+import select
 import shutil
+import signal
+import socket
+import sqlite3
 import subprocess
+import tempfile
+import threading
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+from datetime import datetime
+from time import perf_counter, sleep, time
+
+from venvs import (
+    ENVS_DIR, POETRY_DIR, file_digest, install, requirement_pins, requirements_path, run, run_projects,
+    shared_venv_path, strip_hashes, venv_path,
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 parser = argparse.ArgumentParser()
 parser.add_argument('--install', action='store_true')
+parser.add_argument('--wheelhouse', action='store_true', help='공용 wheelhouse를 만든 후 venv 설치')
+parser.add_argument('--offline', action='store_true', help='index없이 wheelhouse에 있는 wheel만 사용')
+parser.add_argument('--share-venvs', action='store_true', help='대상 프로젝트를 하나의 venv에 설치 (--venv-groups의 그룹 단위)')
+parser.add_argument('--venv-groups', action='store_true', help='venv를 공유할 프로젝트 그룹 출력')
 parser.add_argument('--unarchive', action='store_true')
 parser.add_argument('--nginx', action='store_true')
 parser.add_argument('--supervisor', action='store_true')
 parser.add_argument('--command', action='store_true')
 parser.add_argument('--db', action='store_true')
+parser.add_argument('--secrets', action='store_true', help='Secrets Manager에서 secret을 가져와서 스냅샷 갱신')
+parser.add_argument('--gunicorn', action='store_true', help='컨테이너 자원에 맞춰 프로젝트별 gunicorn 설정 생성')
+parser.add_argument('--dry-run', action='store_true', help='--gunicorn: 설정 파일을 만들지 않고 계획만 출력')
+parser.add_argument('--measure', action='store_true', help='실행중인 gunicorn 프로세스의 메모리 사용량 측정')
+parser.add_argument('--activate', metavar='PROJECT', help='첫 연결시 gunicorn을 시작하고 idle_timeout동안 요청이 없으면 종료')
+parser.add_argument('--rotate-logs', action='store_true', help='gunicorn/nginx 로그를 크기/시간 기준으로 rotate하고 압축 (계속 실행)')
+parser.add_argument('--log-benchmark', type=int, metavar='RECORDS', help='동기 FileHandler와 QueueFileHandler의 로그 지연시간 비교')
+parser.add_argument('--cache-benchmark', type=int, metavar='REQUESTS',
+                    help='cache profile(off, 기본값)별 /, /admin/login/ 처리량 측정')
+parser.add_argument('--health-benchmark', type=int, metavar='REQUESTS',
+                    help='/health/ 처리량 비교 (WSGI wrapper, Django middleware/view)')
+parser.add_argument('--static-benchmark', action='store_true',
+                    help='/static/ 전송량, 재방문시 요청 수 비교 (fingerprint/미리 압축 이전, 이후)')
+parser.add_argument('--nginx-benchmark', type=int, metavar='REQUESTS',
+                    help='응답만 하는 gunicorn app으로 nginx 설정의 req/s, latency 측정 (upstream keepalive 유무)')
+parser.add_argument('--celery-benchmark', type=int, metavar='TASKS', help='실행중인 celery worker에 task를 보내서 처리량 측정')
+parser.add_argument('--projects', nargs='+', help='대상 프로젝트 (기본값: .poetry의 전체 프로젝트)')
 args = parser.parse_args()
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_DIR = os.path.join(ROOT_DIR, '.config')
+TEMPLATES_DIR = os.path.join(CONFIG_DIR, 'templates')
 PROJECTS_DIR = os.path.join(ROOT_DIR, 'projects')
 ARCHIVE_DIR = os.path.join(ROOT_DIR, '.archive')
-POETRY_DIR = os.path.join(ROOT_DIR, '.poetry')
+GUNICORN_DIR = os.path.join(ROOT_DIR, '.gunicorn')
+CELERY_DIR = os.path.join(ROOT_DIR, '.celery')
+ACTIVATION_LOG_PATH = os.path.join(ROOT_DIR, '.log', 'activation.jsonl')
+DB_BACKUP_STATE_PATH = os.path.join(ROOT_DIR, '.log', 'backup.json')
+# celery, supervisord의 로그는 supervisord가 rotate
+LOG_ROTATE_GLOBS = ('/var/log/gunicorn/*.log', '/var/log/nginx/*.log')
+PROJECTS_CONFIG_PATH = os.path.join(CONFIG_DIR, 'projects.json')
+# 프로젝트별 collectstatic 결과와 입력 hash (이미지 빌드시 BuildKit cache mount로 이전 빌드의 결과를 유지)
+STATIC_CACHE_DIR = os.path.join(ROOT_DIR, '.static-cache')
+# container.py가 실행하는 프로젝트 명령(collectstatic, migrate 등)의 설정
+PROJECT_SETTINGS_MODULE = 'config.settings.production'
 
+# nginx gzip_static(및 ngx_brotli module이 있으면 brotli_static)으로 제공할 미리 압축된 static 파일
+STATIC_COMPRESS_EXTENSIONS = (
+    '.css', '.js', '.map', '.json', '.svg', '.html', '.txt', '.xml', '.ico', '.ttf', '.eot', '.otf',
+)
+STATIC_COMPRESS_MIN_SIZE = 256
+# ngx_brotli module이 있을 때만 nginx.project.conf의 /static/에 추가 (없는 directive는 nginx -t 실패)
+NGINX_BROTLI_STATIC = '\n        brotli_static           on;'
+# 이 시간 이상 캐시할 수 있는 static 파일은 재방문시 요청하지 않는 것으로 봄 (--static-benchmark)
+STATIC_REPEAT_VISIT_MAX_AGE = 24 * 60 * 60
 
-def run(cmd, **kwargs):
-    subprocess.run(cmd, shell=True, **kwargs)
+# gunicorn 이외의 프로세스(nginx, supervisord 등)를 위해 남겨둘 메모리 (MB)
+MEMORY_RESERVED = 192
 
+GUNICORN_CONFIG = '''# container.py --gunicorn으로 생성됨 ({cpus:g} CPU, {memory:.0f}MB)
+daemon = False
+chdir = '/srv/{project}/app'
+bind = 'unix:/tmp/{project}.sock'
+worker_class = '{worker_class}'
+workers = {workers}
+threads = {threads}
+timeout = {timeout}
+keepalive = {keepalive}
+max_requests = {max_requests}
+max_requests_jitter = {max_requests_jitter}
+preload_app = {preload_app}
+# print등의 stdout/stderr는 errorlog로, 로그는 log_handlers.QueueFileHandler로 (container.py --rotate-logs가 rotate)
+errorlog = '/var/log/gunicorn/{project}-error.log'
+capture_output = True
+logger_class = 'log_handlers.JsonAccessLogger'
+logconfig_dict = {{
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {{
+        'generic': {{'format': '%(asctime)s [%(process)d] [%(levelname)s] %(message)s'}},
+        'message': {{'format': '%(message)s'}},
+    }},
+    'handlers': {{
+        'access': {{
+            'class': 'log_handlers.QueueFileHandler',
+            'filename': '/var/log/gunicorn/{project}.log',
+            'formatter': 'message',
+        }},
+        'error': {{
+            'class': 'log_handlers.QueueFileHandler',
+            'filename': '/var/log/gunicorn/{project}-error.log',
+            'formatter': 'generic',
+        }},
+    }},
+    'root': {{'level': 'INFO', 'handlers': ['error']}},
+    'loggers': {{
+        'gunicorn.access': {{'level': 'INFO', 'handlers': ['access'], 'propagate': False}},
+        'gunicorn.error': {{'level': 'INFO', 'handlers': ['error'], 'propagate': False}},
+    }},
+}}
+raw_env = [
+    'DJANGO_SETTINGS_MODULE=config.settings.production',
+    'DJANGO_PRELOAD={preload_env}',
+    'DJANGO_DB_POOL={db_pool_env}',
+    'GUNICORN_WORKERS={workers}',
+    'GUNICORN_THREADS={threads}',
+    'DB_MAX_CONNECTIONS={db_max_connections}',
+    'CELERY_BROKER_URL={celery_broker_url}',
+]
+pythonpath = '/srv/envs/env-{project},/srv/project'
+'''
 
-def install():
-    os.chdir(ROOT_DIR)
-    for project in os.listdir(POETRY_DIR):
-        run(f'python3 -m venv /srv/envs/env-{project}')
-        run(f'/srv/envs/env-{project}/bin/pip3 install'
-            f' -r /srv/project/.poetry/{project}/requirements.txt')
+# --nginx-benchmark: 실행중인 nginx에 추가하는 server(와 upstream socket)의 이름, 동시 연결 수, 응답만 하는 WSGI app
+NGINX_BENCHMARK_NAME = 'nginx-benchmark'
+NGINX_BENCHMARK_CONCURRENCY = 16
+NGINX_BENCHMARK_APP = '''
+BODY = b'x' * 1024
+
+
+def application(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain'), ('Content-Length', str(len(BODY)))])
+    return [BODY]
+'''
+
+# 로그 rotate 기준 (크기, 시간), 보관할 압축 파일 수, 확인 간격 (초)
+LOG_ROTATE_MAX_BYTES = 50 * 1024 * 1024
+LOG_ROTATE_MAX_AGE = 24 * 60 * 60
+LOG_ROTATE_BACKUPS = 7
+LOG_ROTATE_INTERVAL = 60
+
+# Celery worker를 위해 사용할 수 있는 최대 메모리 비율 (gunicorn 예산에서 먼저 제외)
+CELERY_MEMORY_SHARE = 0.3
+# short: 짧은 task를 여러개 미리 가져와서 처리량 우선
+# long: 하나씩 가져와서 다른 process가 놀지 않도록 하고, 처리 후 ack해서 worker가 죽으면 다시 실행
+CELERY_PROFILES = {
+    'short': {'prefetch_multiplier': 4, 'acks_late': False, 'time_limit': 60, 'optimization': 'default'},
+    'long': {'prefetch_multiplier': 1, 'acks_late': True, 'time_limit': 60 * 60, 'optimization': 'fair'},
+}
+# supervisord.conf의 [include]로 포함됨
+CELERY_PROGRAM = (
+    '# container.py --gunicorn으로 생성됨 (profile: {profile})\n'
+    '[program:celery-{project}]\n'
+    'command=/srv/envs/env-{project}/bin/celery -A config worker -Q {project} -n {project}@%%h'
+    ' --autoscale={max_concurrency},{min_concurrency} -O {optimization} --time-limit={time_limit}'
+    ' --max-tasks-per-child={max_tasks_per_child} --max-memory-per-child={max_memory_kb} --loglevel=INFO\n'
+    'directory=/srv/{project}/app\n'
+    'environment=DJANGO_SETTINGS_MODULE="config.settings.production",PYTHONPATH="/srv/project",'
+    'CELERY_BROKER_URL="{broker_url}",CELERY_TASK_ACKS_LATE="{acks_late:d}",'
+    'CELERY_WORKER_PREFETCH_MULTIPLIER="{prefetch_multiplier}"\n'
+    'stdout_logfile=/var/log/celery/{project}.log\n'
+    'redirect_stderr=true\n'
+    'stopwaitsecs={time_limit}\n'
+    'stopasgroup=true\n'
+    'killasgroup=true\n'
+)
+
+# 프로젝트의 requirements 중 이 비율 이상이 그룹과 겹쳐야 venv를 공유
+VENV_SHARE_MIN_OVERLAP = 0.5
+
+# DB 백업: 동시에 dump하는 프로젝트 수 (DB 부하 제한), 프로젝트별 동시 업로드 part 수, part 크기
+DB_BACKUP_WORKERS = 2
+DB_BACKUP_UPLOAD_WORKERS = 4
+DB_BACKUP_PART_SIZE = 8 * 1024 * 1024
+DB_BACKUP_READ_SIZE = 1024 * 1024
+
+
+def get_projects():
+    return args.projects or sorted(os.listdir(POETRY_DIR))
+
+
+def venv_groups(projects):
+    """
+    같은 venv를 사용할 수 있는 프로젝트 그룹
+    같은 패키지는 모두 같은 버전이고(충돌 없음), 프로젝트 requirements의 VENV_SHARE_MIN_OVERLAP 이상이
+    그룹과 겹치는 경우 가장 많이 겹치는 그룹에 추가 (projects.json의 share_venv가 false면 단독)
+    """
+    groups = []
+    for project in sorted(projects):
+        pins = {name: strip_hashes(requirement) for name, requirement in requirement_pins(project).items()}
+        best, best_shared = None, 0
+        if project_config(project)['share_venv']:
+            for group in groups:
+                if not group['shareable'] or any(group['pins'].get(name, pin) != pin for name, pin in pins.items()):
+                    continue
+                shared = len(group['pins'].keys() & pins.keys())
+                if shared >= VENV_SHARE_MIN_OVERLAP * len(pins) and shared > best_shared:
+                    best, best_shared = group, shared
+        if best:
+            best['projects'].append(project)
+            best['pins'].update(pins)
+        else:
+            groups.append({'projects': [project], 'pins': pins, 'shareable': project_config(project)['share_venv']})
+    return [group['projects'] for group in groups]
+
+
+def print_venv_groups():
+    """
+    그룹 목록, 마지막 줄은 deploy.py가 Dockerfile의 layer를 나누는데 사용하는 JSON
+    """
+    groups = venv_groups(get_projects())
+    for group in groups:
+        if len(group) > 1:
+            pins = [set(map(strip_hashes, requirement_pins(project).values())) for project in group]
+            print(f' - {shared_venv_path(group)}: {", ".join(group)} '
+                  f'({len(set.intersection(*pins))} shared / {len(set.union(*pins))} requirements)')
+        else:
+            print(f' - {venv_path(group[0])}: {group[0]}')
+    print(json.dumps(groups))
 
 
 def unarchive():
     os.chdir(ROOT_DIR)
     os.makedirs(PROJECTS_DIR, exist_ok=True)
-    for project in os.listdir(POETRY_DIR):
-        run(f'tar -xzvf .archive/{project}.tar.gz -C /srv')
+    for project in get_projects():
+        # 압축 방식(gzip, zstd, 무압축)은 tar가 자동으로 판별
+        archive_path = glob(os.path.join(ARCHIVE_DIR, f'{project}.tar*'))[0]
+        run(f'tar -xf {archive_path} -C /srv', check=True)
+
+
+def render_template(name, context):
+    with open(os.path.join(TEMPLATES_DIR, name), 'rt') as f:
+        return f.read() % context
 
 
 def nginx():
-    os.chdir(ROOT_DIR)
-    for project in os.listdir(POETRY_DIR):
-        shutil.copy(os.path.join(CONFIG_DIR, project, f'nginx.{project}.conf'), '/etc/nginx/conf.d/')
+    """
+    .config/templates의 nginx.conf(CPU 수에 맞춘 worker), nginx.project.conf(프로젝트별 server, upstream) 생성 후 검증
+    upstream keepalive 연결 수는 gunicorn의 workers * threads
+    """
+    cpus, memory, budget, plan = gunicorn_plan(get_projects())
+    worker_processes = max(1, round(cpus))
+    with open('/etc/nginx/nginx.conf', 'wt') as f:
+        f.write(render_template('nginx.conf', {
+            'cpus': cpus,
+            'worker_processes': worker_processes,
+            'worker_connections': 1024,
+            'worker_rlimit_nofile': 4096,
+        }))
+    for project, config in plan.items():
+        locations = ''.join(
+            f'    location {path} {{\n        {directive}\n    }}\n'
+            for path, directive in config['locations'].items()
+        )
+        with open(os.path.join('/etc/nginx/conf.d', f'nginx.{project}.conf'), 'wt') as f:
+            f.write(render_template('nginx.project.conf', dict(
+                config,
+                keepalive_connections=config['workers'] * config['threads'],
+                locations=locations,
+                brotli_static=NGINX_BROTLI_STATIC if nginx_brotli() else '',
+            )))
+    run('nginx -t', check=True)
+    print(f'Nginx: {worker_processes} worker processes, {len(plan)} projects')
+
+
+def gunicorn_command(project):
+    return [
+        f'/srv/envs/env-{project}/bin/gunicorn',
+        '-c', f'{os.path.join(GUNICORN_DIR, project)}.py',
+        'config.wsgi.production:application',
+    ]
 
 
 def supervisor():
     os.chdir(ROOT_DIR)
     with open(os.path.join(CONFIG_DIR, 'supervisord.conf'), 'at') as f:
-        for project in os.listdir(POETRY_DIR):
+        for project in get_projects():
             f.write('\n')
             f.write(f'[program:{project}]\n')
-            f.write(f'command=/srv/envs/env-{project}/bin/gunicorn -c '
-                    f'/srv/project/.config/{project}/gunicorn.py '
-                    f'config.wsgi.production:application\n')
+            if project_config(project)['warm']:
+                f.write(f'command={" ".join(gunicorn_command(project))}\n')
+            else:
+                # 요청이 적은 프로젝트는 activator가 socket을 가지고 있다가 필요할때만 gunicorn 실행
+                f.write(f'command=python3 {os.path.join(ROOT_DIR, "container.py")} --activate {project}\n')
+                f.write('stopasgroup=true\n')
+
+
+def project_config(project):
+    """
+    .config/projects.json의 default 설정에 프로젝트별 설정을 덮어쓴 값
+    """
+    with open(PROJECTS_CONFIG_PATH, 'rt') as f:
+        projects_config = json.load(f)
+    config = dict(projects_config['default'])
+    for key, value in projects_config.get(project, {}).items():
+        # celery와 같은 하위 설정은 default에 덮어씀
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            value = dict(config[key], **value)
+        config[key] = value
+    return config
+
+
+def read_first_line(path):
+    try:
+        with open(path, 'rt') as f:
+            return f.readline().strip()
+    except (FileNotFoundError, PermissionError):
+        return None
+
+
+def container_cpus():
+    """
+    cgroup(v2, v1)의 CPU 제한, 제한이 없으면 CPU 수
+    """
+    cpu_max = read_first_line('/sys/fs/cgroup/cpu.max')
+    if cpu_max and not cpu_max.startswith('max'):
+        quota, period = cpu_max.split()
+        return int(quota) / int(period)
+    quota = read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+    period = read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return float(os.cpu_count() or 1)
+
+
+def container_memory():
+    """
+    cgroup(v2, v1)의 메모리 제한 (MB), 제한이 없으면 전체 메모리
+    """
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        limit = read_first_line(path)
+        # cgroup v1은 제한이 없으면 매우 큰 값
+        if limit and limit != 'max' and int(limit) < 1 << 60:
+            return int(limit) / 1024 / 1024
+    with open('/proc/meminfo', 'rt') as f:
+        for line in f:
+            if line.startswith('MemTotal:'):
+                return int(line.split()[1]) / 1024
+
+
+def celery_plan(configs, cpus, budget):
+    """
+    celery.enabled인 프로젝트의 autoscale 범위 결정
+    예산의 CELERY_MEMORY_SHARE를 weight 비율로 나누고, 그 안에 들어가는 process 수(최대 2 * CPU)까지 허용
+    """
+    enabled = {project: config for project, config in configs.items() if config['celery']['enabled']}
+    total_weight = sum(config['weight'] for config in enabled.values())
+    plan = {}
+    for project, config in enabled.items():
+        celery = config['celery']
+        share = budget * CELERY_MEMORY_SHARE * config['weight'] / total_weight
+        min_concurrency, max_concurrency = celery['concurrency']
+        fits = int(share // celery['rss']) - 1
+        max_concurrency = max(min_concurrency, min(max_concurrency, fits, int(2 * cpus)))
+        plan[project] = dict(
+            CELERY_PROFILES[celery['profile']],
+            **celery,
+            project=project,
+            min_concurrency=min_concurrency,
+            max_concurrency=max_concurrency,
+            max_memory_kb=celery['max_memory_per_child'] * 1024,
+            memory_estimate=(1 + max_concurrency) * celery['rss'],
+        )
+    return plan
+
+
+def gunicorn_plan(projects):
+    """
+    Celery worker의 메모리를 먼저 제외하고,
+    전체 메모리 예산(master_rss + workers * rss의 합) 안에서 프로젝트별 worker 수 결정
+    모든 프로젝트에 worker 1개를 할당한 후, weight 대비 worker가 가장 적은 프로젝트부터 하나씩 추가
+    전체 worker 수는 gunicorn 권장값(2 * CPU + 1)을 넘지 않음
+    warm이 아닌(socket activation) 프로젝트는 worker 1개만 사용하고, 나머지는 warm 프로젝트에 할당
+    persistent connection은 thread별로 유지되므로 프로젝트의 workers * threads는 db_max_connections를 넘지 않음
+    """
+    cpus, memory = container_cpus(), container_memory()
+    budget = memory - MEMORY_RESERVED
+    configs = {project: project_config(project) for project in projects}
+    celery = celery_plan(configs, cpus, budget)
+    budget -= sum(config['memory_estimate'] for config in celery.values())
+    workers = {project: 1 for project in projects}
+    max_workers = max(len(projects), int(2 * cpus + 1))
+
+    def _used():
+        return sum(config['master_rss'] + workers[project] * config['rss'] for project, config in configs.items())
+
+    if _used() > budget:
+        print(f'WARNING: worker 1개씩만 할당해도 메모리 예산({budget:.0f}MB)을 초과합니다 ({_used():.0f}MB)')
+    while sum(workers.values()) < max_workers:
+        candidates = [
+            project for project, config in configs.items()
+            if config['warm']
+            and _used() + config['rss'] <= budget
+            and (workers[project] + 1) * config['threads'] <= config['db_max_connections']
+        ]
+        if not candidates:
+            break
+        project = min(candidates, key=lambda p: (workers[p] / configs[p]['weight'], p))
+        workers[project] += 1
+
+    plan = {}
+    for project, config in configs.items():
+        threads = max(1, min(config['threads'], config['db_max_connections'] // workers[project]))
+        plan[project] = dict(
+            config,
+            project=project,
+            workers=workers[project],
+            threads=threads,
+            worker_class='gthread' if threads > 1 else 'sync',
+            memory_estimate=config['master_rss'] + workers[project] * config['rss'],
+            celery=celery.get(project),
+        )
+    return cpus, memory, budget, plan
+
+
+def gunicorn(dry_run=False):
+    projects = get_projects()
+    cpus, memory, budget, plan = gunicorn_plan(projects)
+    print(f'Gunicorn plan ({cpus:g} CPU, {memory:.0f}MB, budget {budget:.0f}MB)')
+    for project, config in plan.items():
+        print(f' - {project:<16} {config["worker_class"]:<8} workers={config["workers"]} '
+              f'threads={config["threads"]} max_requests={config["max_requests"]}'
+              f'(+{config["max_requests_jitter"]}) preload={config["preload_app"]} '
+              f'~{config["memory_estimate"]:.0f}MB')
+        if config['celery']:
+            celery = config['celery']
+            print(f'   celery {celery["profile"]:<6} autoscale={celery["max_concurrency"]},{celery["min_concurrency"]} '
+                  f'prefetch={celery["prefetch_multiplier"]} acks_late={celery["acks_late"]} '
+                  f'max_tasks_per_child={celery["max_tasks_per_child"]} ~{celery["memory_estimate"]:.0f}MB')
+    print(' Total: {:.0f}MB'.format(sum(
+        config['memory_estimate'] + (config['celery']['memory_estimate'] if config['celery'] else 0)
+        for config in plan.values()
+    )))
+    if dry_run:
+        return
+
+    os.makedirs(GUNICORN_DIR, exist_ok=True)
+    for project, config in plan.items():
+        with open(os.path.join(GUNICORN_DIR, f'{project}.py'), 'wt') as f:
+            f.write(GUNICORN_CONFIG.format(
+                cpus=cpus,
+                memory=memory,
+                preload_env=int(bool(config['preload_app'])),
+                db_pool_env=int(bool(config['db_pool'])),
+                celery_broker_url=config['celery']['broker_url'] if config['celery'] else '',
+                **config,
+            ))
+
+    # supervisord 시작 전에 다시 생성되므로 이전 설정은 삭제
+    shutil.rmtree(CELERY_DIR, ignore_errors=True)
+    os.makedirs(CELERY_DIR)
+    for project, config in plan.items():
+        if config['celery']:
+            with open(os.path.join(CELERY_DIR, f'{project}.conf'), 'wt') as f:
+                f.write(CELERY_PROGRAM.format(**config['celery']))
+
+
+def gunicorn_processes():
+    """
+    실행중인 gunicorn 프로세스 {pid: (project, master 여부)}
+    """
+    processes = {}
+    for pid in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                cmdline = f.read().decode(errors='replace').split('\0')
+            with open(f'/proc/{pid}/stat', 'rt') as f:
+                ppid = f.read().rsplit(')', 1)[1].split()[1]
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+        for arg in cmdline:
+            if arg.startswith(GUNICORN_DIR) and arg.endswith('.py'):
+                processes[int(pid)] = (os.path.basename(arg)[:-3], int(ppid))
+    return {
+        pid: (project, ppid not in processes)
+        for pid, (project, ppid) in processes.items()
+    }
+
+
+def process_memory(pid):
+    """
+    프로세스의 메모리 사용량 (MB)
+    USS(Private_Clean + Private_Dirty)는 다른 프로세스와 공유하지 않는, 프로세스를 추가할때 늘어나는 메모리
+    """
+    memory = {}
+    with open(f'/proc/{pid}/smaps_rollup', 'rt') as f:
+        for line in f:
+            key, value = line.split(':', 1)
+            if key in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'):
+                memory[key] = int(value.split()[0]) / 1024
+    memory['Uss'] = memory.pop('Private_Clean', 0) + memory.pop('Private_Dirty', 0)
+    return memory
+
+
+def venv_memory(pid):
+    """
+    프로세스가 mmap한 venv 파일(.so, site-packages의 파일)의 메모리 {venv 이름: {'Rss', 'Pss'}} (MB)
+    """
+    memory, venv = defaultdict(lambda: {'Rss': 0, 'Pss': 0}), None
+    with open(f'/proc/{pid}/smaps', 'rt') as f:
+        for line in f:
+            fields = line.split()
+            if not fields[0].endswith(':'):
+                # mapping 시작 줄 (주소 권한 offset 장치 inode [경로])
+                path = fields[5] if len(fields) > 5 else ''
+                venv = os.path.relpath(path, ENVS_DIR).split(os.sep)[0] if path.startswith(ENVS_DIR + os.sep) else None
+            elif venv and fields[0] in ('Rss:', 'Pss:'):
+                memory[venv][fields[0][:-1]] += int(fields[1]) / 1024
+    return dict(memory)
+
+
+def shared_venv_memory(processes):
+    """
+    공유 venv별 (프로젝트 목록, 실제 메모리, 프로젝트마다 venv가 있을때의 메모리)
+    processes: [(프로젝트, venv_memory())]
+    같은 venv의 파일은 프로젝트가 달라도 같은 inode의 page cache를 공유하므로 실제 메모리는 PSS의 합
+    프로젝트마다 venv가 따로 있었다면 프로젝트별로 가장 많이 사용한 프로세스의 RSS만큼은 각각 필요 (하한)
+    """
+    venvs = defaultdict(lambda: defaultdict(list))
+    for project, memory in processes:
+        for venv, values in memory.items():
+            venvs[venv][project].append(values)
+    return {
+        venv: (
+            sorted(projects),
+            sum(values['Pss'] for memories in projects.values() for values in memories),
+            sum(max(values['Rss'] for values in memories) for memories in projects.values()),
+        )
+        for venv, projects in venvs.items()
+        if len(projects) > 1
+    }
+
+
+def measure():
+    """
+    실행중인 gunicorn의 프로젝트별 master/worker 메모리 측정, projects.json의 rss/master_rss에 사용
+    worker는 USS를 기준으로 하므로 preload_app 설정 전후의 공유 효과를 비교할 수 있음
+    공유 venv는 venv 파일의 메모리를 프로젝트마다 venv가 있는 경우와 비교
+    """
+    measured = defaultdict(lambda: {'master': [], 'worker': []})
+    mapped = []
+    for pid, (project, is_master) in gunicorn_processes().items():
+        try:
+            memory = process_memory(pid)
+            mapped.append((project, venv_memory(pid)))
+        except FileNotFoundError:
+            continue
+        measured[project]['master' if is_master else 'worker'].append(memory)
+
+    suggestion = {}
+    print(f'{"project":<16}{"role":<8}{"RSS":>10}{"PSS":>10}{"USS":>10}')
+    for project, roles in sorted(measured.items()):
+        for role, memories in roles.items():
+            for memory in memories:
+                print(f'{project:<16}{role:<8}{memory["Rss"]:>8.1f}MB{memory["Pss"]:>8.1f}MB{memory["Uss"]:>8.1f}MB')
+        workers = roles['worker'] or roles['master']
+        suggestion[project] = {
+            'rss': round(sum(memory['Uss'] for memory in workers) / len(workers)),
+            'master_rss': round(sum(memory['Rss'] for memory in roles['master']) / max(len(roles['master']), 1)),
+        }
+    for venv, (projects, shared, separate) in sorted(shared_venv_memory(mapped).items()):
+        print(f'{venv}: {", ".join(projects)} venv files {shared:.1f}MB, '
+              f'~{separate:.1f}MB with one venv per project ({separate - shared:.1f}MB saved)')
+    print(json.dumps(suggestion, indent=2))
+
+
+CELERY_BENCHMARK_SCRIPT = '''
+import json
+import sys
+import time
+
+import django
+django.setup()
+
+from config.celery import app
+
+tasks, queue = int(sys.argv[1]), sys.argv[2]
+started_at = time.perf_counter()
+# 결과 저장소 없이도 동작하는 내장 task (no-op)
+for _ in range(tasks):
+    app.send_task('celery.backend_cleanup', queue=queue)
+published = time.perf_counter() - started_at
+
+# 대기열과 ack되지 않은 메세지가 모두 없어질 때까지
+with app.connection_for_write() as connection:
+    client = connection.default_channel.client
+    while client.llen(queue) or client.hlen('unacked'):
+        if time.perf_counter() - started_at > 600:
+            raise Exception('timeout')
+        time.sleep(0.01)
+elapsed = time.perf_counter() - started_at
+print(json.dumps({'published': published, 'elapsed': elapsed}))
+'''
+
+
+def celery_benchmark(tasks):
+    """
+    실행중인 프로젝트별 celery worker에 no-op task를 보내서 처리량 측정
+    """
+    _, _, _, plan = gunicorn_plan(get_projects())
+    for project, config in plan.items():
+        if not config['celery']:
+            continue
+        result = subprocess.run(
+            [os.path.join(venv_path(project), 'bin', 'python3'), '-c', CELERY_BENCHMARK_SCRIPT, str(tasks), project],
+            cwd=os.path.join(os.sep, 'srv', project, 'app'),
+            env=dict(
+                os.environ,
+                DJANGO_SETTINGS_MODULE='config.settings.production',
+                PYTHONPATH=ROOT_DIR,
+                CELERY_BROKER_URL=config['celery']['broker_url'],
+            ),
+            check=True, capture_output=True,
+        )
+        summary = json.loads(result.stdout.decode().strip().splitlines()[-1])
+        print(f' - {project:<16} {tasks} tasks, publish {tasks / summary["published"]:.0f}/s, '
+              f'total {summary["elapsed"]:.2f}s ({tasks / summary["elapsed"]:.0f} tasks/s)')
+
+
+CACHE_BENCHMARK_SCRIPT = '''
+import json
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from config.cache import cache_stats
+
+requests = int(sys.argv[1])
+application = get_wsgi_application()
+host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+
+
+def request(path):
+    environ = {'PATH_INFO': path, 'HTTP_HOST': host}
+    setup_testing_defaults(environ)
+    status = []
+    response = application(environ, lambda s, headers, exc_info=None: status.append(s))
+    b''.join(response)
+    response.close()
+    return int(status[0].split()[0])
+
+
+paths = {}
+for path in ('/', '/admin/login/'):
+    status = request(path)
+    started_at = time.perf_counter()
+    for _ in range(requests):
+        request(path)
+    paths[path] = {'status': status, 'rps': requests / (time.perf_counter() - started_at)}
+print(json.dumps({'profile': settings.CACHE_PROFILE, 'paths': paths, 'cache': cache_stats()}))
+'''
+
+
+def cache_benchmark(requests):
+    """
+    프로젝트별 /, /admin/login/의 처리량을 cache profile을 끈 경우(off)와 기본값으로 비교
+    nginx, gunicorn을 거치지 않고 Django WSGI application을 직접 호출
+    """
+    for project in get_projects():
+        for profile in ('off', ''):
+            result = subprocess.run(
+                [os.path.join(venv_path(project), 'bin', 'python3'), '-c', CACHE_BENCHMARK_SCRIPT, str(requests)],
+                cwd=os.path.join(os.sep, 'srv', project, 'app'),
+                env=dict(project_env(), DJANGO_CACHE_PROFILE=profile),
+                check=True, capture_output=True,
+            )
+            summary = json.loads(result.stdout.decode().strip().splitlines()[-1])
+            paths = ', '.join(
+                f'{path} {values["rps"]:.0f} req/s ({values["status"]})' for path, values in summary['paths'].items()
+            )
+            hit_rate = summary['cache']['hit_rate']
+            print(f' - {project:<16} {summary["profile"]:<5} {paths}'
+                  f'{f", hit rate {hit_rate:.0%}" if hit_rate is not None else ""}')
+
+
+HEALTH_BENCHMARK_SCRIPT = '''
+import json
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.http import JsonResponse
+from django.urls import path
+
+from config import urls
+from config.health import LIVENESS_PATH, HealthCheckMiddleware
+
+requests = int(sys.argv[1])
+django_application = get_wsgi_application()
+# wrapper가 없을 때와 같이 전체 MIDDLEWARE와 URL dispatch를 거쳐서 같은 응답을 하는 view
+urls.urlpatterns.append(path(LIVENESS_PATH.strip('/') + '/', lambda request: JsonResponse({'status': 'ok'})))
+applications = {
+    'wrapper': HealthCheckMiddleware(django_application),
+    'django': django_application,
+}
+host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+
+
+def request(application):
+    environ = {'PATH_INFO': LIVENESS_PATH, 'HTTP_HOST': host}
+    setup_testing_defaults(environ)
+    status = []
+    response = application(environ, lambda s, headers, exc_info=None: status.append(s))
+    b''.join(response)
+    if hasattr(response, 'close'):
+        response.close()
+    return int(status[0].split()[0])
+
+
+results = {}
+for name, application in applications.items():
+    status = request(application)
+    started_at = time.perf_counter()
+    for _ in range(requests):
+        request(application)
+    results[name] = {'status': status, 'rps': requests / (time.perf_counter() - started_at)}
+print(json.dumps(results))
+'''
+
+
+def health_benchmark(requests):
+    """
+    프로젝트별 /health/ 처리량을 HealthCheckMiddleware(WSGI wrapper)와 Django(middleware, URL dispatch, view)로 비교
+    nginx, gunicorn을 거치지 않고 WSGI application을 직접 호출
+    """
+    for project in get_projects():
+        result = subprocess.run(
+            [os.path.join(venv_path(project), 'bin', 'python3'), '-c', HEALTH_BENCHMARK_SCRIPT, str(requests)],
+            cwd=os.path.join(os.sep, 'srv', project, 'app'),
+            env=project_env(),
+            check=True, capture_output=True,
+        )
+        summary = json.loads(result.stdout.decode().strip().splitlines()[-1])
+        wrapper, django = summary['wrapper'], summary['django']
+        print(f' - {project:<16} wrapper {wrapper["rps"]:.0f} req/s ({wrapper["status"]}), '
+              f'django {django["rps"]:.0f} req/s ({django["status"]}), '
+              f'x{wrapper["rps"] / django["rps"]:.1f}')
+
+
+def measure_static(static_root, host, address='127.0.0.1', port=80):
+    """
+    manifest(staticfiles.json)의 모든 파일을 nginx에 요청해서 전송량과 재방문시 요청 수 비교
+    before: 원래 이름, 압축하지 않은 응답, 캐시 헤더 없음 (재방문시 모든 파일을 다시 확인)
+    after: hash가 포함된 이름, Accept-Encoding(nginx가 brotli_static을 지원하면 br, gzip), 응답의 Cache-Control 기준
+    """
+    accept_encoding = 'br, gzip' if nginx_brotli() else 'gzip'
+    with open(os.path.join(static_root, 'staticfiles.json'), 'rt') as f:
+        paths = json.load(f)['paths']
+    connection = http.client.HTTPConnection(address, port, timeout=10)
+    result = {
+        'files': len(paths),
+        'before': {'bytes': 0, 'repeat_requests': len(paths)},
+        'after': {'bytes': 0, 'repeat_requests': 0, 'encodings': defaultdict(int)},
+    }
+    try:
+        for name, hashed_name in paths.items():
+            for key, path, headers in (
+                ('before', name, {}),
+                ('after', hashed_name, {'Accept-Encoding': accept_encoding}),
+            ):
+                connection.request('GET', f'/static/{path}', headers=dict(headers, Host=host))
+                response = connection.getresponse()
+                body = response.read()
+                if response.status != 200:
+                    raise Exception(f'/static/{path}: {response.status}')
+                result[key]['bytes'] += len(body)
+                if key == 'after':
+                    result[key]['encodings'][response.getheader('Content-Encoding') or 'identity'] += 1
+                    max_age = re.search(r'max-age=(\d+)', response.getheader('Cache-Control') or '')
+                    if not max_age or int(max_age.group(1)) < STATIC_REPEAT_VISIT_MAX_AGE:
+                        result[key]['repeat_requests'] += 1
+    finally:
+        connection.close()
+    return result
+
+
+def static_benchmark():
+    """
+    프로젝트별 /static/의 전송량과 재방문시 요청 수 (실행중인 nginx에 요청)
+    """
+    for project in get_projects():
+        host = next(name for name in project_config(project)['server_name'].split() if '*' not in name)
+        result = measure_static(os.path.join(os.sep, 'srv', project, '.static'), host)
+        before, after = result['before'], result['after']
+        print(f' - {project:<16} {result["files"]} files, '
+              f'before {before["bytes"] / 1024:.0f}KB / {before["repeat_requests"]} repeat requests, '
+              f'after {after["bytes"] / 1024:.0f}KB / {after["repeat_requests"]} repeat requests '
+              f'({after["bytes"] / max(before["bytes"], 1) - 1:+.0%} bytes, '
+              f'{", ".join(f"{encoding} {count}" for encoding, count in sorted(after["encodings"].items()))})')
+
+
+def nginx_benchmark_conf(config, name, keepalive=True):
+    """
+    nginx.project.conf로 만든 benchmark용 server, keepalive=False면 upstream 연결을 요청마다 새로 맺음
+    (upstream 블록 없이 proxy_pass http://unix:...를 사용하던 이전 설정과 같음)
+    """
+    conf = render_template('nginx.project.conf', dict(
+        config,
+        project=name,
+        server_name=f'{name}.localhost',
+        keepalive_connections=config['workers'] * config['threads'],
+        locations='',
+        brotli_static=NGINX_BROTLI_STATIC if nginx_brotli() else '',
+    ))
+    if not keepalive:
+        conf = re.sub(r'\n\s*keepalive(?:_timeout)? [^;]*;', '', conf)
+    return conf
+
+
+def load_test(address, port, host, requests, concurrency=NGINX_BENCHMARK_CONCURRENCY, path='/'):
+    """
+    wrk/ab와 같이 concurrency개의 keep-alive 연결로 모두 requests개의 요청을 보내고 req/s, latency(ms) 측정
+    """
+    remaining, latencies, lock = [requests], [], threading.Lock()
+
+    def _connection():
+        connection = http.client.HTTPConnection(address, port, timeout=10)
+        elapsed = []
+        try:
+            while True:
+                with lock:
+                    if not remaining[0]:
+                        break
+                    remaining[0] -= 1
+                started_at = perf_counter()
+                connection.request('GET', path, headers={'Host': host})
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    raise Exception(f'{host}{path}: {response.status}')
+                elapsed.append(perf_counter() - started_at)
+        finally:
+            connection.close()
+        with lock:
+            latencies.extend(elapsed)
+
+    started_at = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(_connection) for _ in range(concurrency)]:
+            future.result()
+    elapsed = perf_counter() - started_at
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def nginx_benchmark(requests):
+    """
+    실행중인 nginx에 benchmark용 server를 추가하고, 응답만 하는 gunicorn app(첫 프로젝트의 venv, worker/thread 설정)에
+    부하를 줘서 upstream keepalive가 있는 설정(현재)과 없는 설정의 req/s, latency 비교
+    """
+    _, _, _, plan = gunicorn_plan(get_projects())
+    project, config = next(iter(plan.items()))
+    variants = {'keepalive': NGINX_BENCHMARK_NAME, 'no keepalive': f'{NGINX_BENCHMARK_NAME}-close'}
+    conf_paths = [os.path.join('/etc/nginx/conf.d', f'nginx.{name}.conf') for name in variants.values()]
+    with tempfile.TemporaryDirectory() as app_dir:
+        with open(os.path.join(app_dir, 'benchmark_app.py'), 'wt') as f:
+            f.write(NGINX_BENCHMARK_APP)
+        for (variant, name), conf_path in zip(variants.items(), conf_paths):
+            with open(conf_path, 'wt') as f:
+                f.write(nginx_benchmark_conf(config, name, keepalive=variant == 'keepalive'))
+        binds = [option for name in variants.values() for option in ('-b', f'unix:/tmp/{name}.sock')]
+        process = subprocess.Popen(
+            [os.path.join(venv_path(project), 'bin', 'gunicorn'), '--chdir', app_dir,
+             '-w', str(config['workers']), '--threads', str(config['threads']), *binds, 'benchmark_app:application'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            run('nginx -t && nginx -s reload', check=True, capture_output=True)
+            while not all(os.path.exists(f'/tmp/{name}.sock') for name in variants.values()):
+                if process.poll() is not None:
+                    raise Exception('benchmark gunicorn 실행 실패')
+                sleep(0.1)
+            print(f'Nginx benchmark: {requests} requests, {NGINX_BENCHMARK_CONCURRENCY} connections, '
+                  f'gunicorn workers={config["workers"]} threads={config["threads"]} ({project})')
+            for variant, name in variants.items():
+                # nginx worker의 upstream 연결 준비
+                load_test('127.0.0.1', 80, f'{name}.localhost', NGINX_BENCHMARK_CONCURRENCY)
+                result = load_test('127.0.0.1', 80, f'{name}.localhost', requests)
+                print(f' - {variant:<14} {result["rps"]:>8.0f} req/s, '
+                      f'p50 {result["p50"]:.2f}ms, p99 {result["p99"]:.2f}ms')
+        finally:
+            process.terminate()
+            process.wait()
+            for conf_path in conf_paths:
+                os.remove(conf_path)
+            run('nginx -s reload', capture_output=True)
+
+
+def activation_event(project, event, **values):
+    record = {'project': project, 'event': event, 'at': time(), **values}
+    print(json.dumps(record), flush=True)
+    os.makedirs(os.path.dirname(ACTIVATION_LOG_PATH), exist_ok=True)
+    with open(ACTIVATION_LOG_PATH, 'at') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def activate(project):
+    """
+    프로젝트의 unix socket을 직접 열어두고, 첫 연결이 들어오면 socket을 넘겨서 gunicorn 실행
+    (systemd socket activation과 같은 LISTEN_FDS 방식이므로 gunicorn은 종료시 socket 파일을 지우지 않음)
+    access log가 idle_timeout동안 늘어나지 않으면 gunicorn을 종료하고 다시 연결을 기다림
+    연결은 gunicorn이 시작되는 동안 listen backlog에서 대기하므로 nginx에서는 느린 응답으로만 보임
+    """
+    config = project_config(project)
+    socket_path = f'/tmp/{project}.sock'
+    access_log_path = f'/var/log/gunicorn/{project}.log'
+
+    def _log_size():
+        try:
+            return os.path.getsize(access_log_path)
+        except FileNotFoundError:
+            return 0
+
+    def _pass_socket():
+        # LISTEN_FDS는 3번 fd부터 시작
+        if listener.fileno() == 3:
+            os.set_inheritable(3, True)
+        else:
+            os.dup2(listener.fileno(), 3)
+
+    def _stop(signum, frame):
+        raise SystemExit(0)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    os.chmod(socket_path, 0o777)
+    listener.listen(2048)
+    signal.signal(signal.SIGTERM, _stop)
+
+    process = None
+    try:
+        while True:
+            # 대기중인 연결이 생길때까지 (accept하지 않음)
+            select.select([listener], [], [])
+            started_at = perf_counter()
+            log_size = _log_size()
+            process = subprocess.Popen(
+                ['/bin/sh', '-c', 'LISTEN_PID=$$ LISTEN_FDS=1 exec "$@"', 'gunicorn', *gunicorn_command(project)],
+                preexec_fn=_pass_socket, close_fds=False,
+            )
+            # gunicorn worker가 대기중인 연결을 accept할때까지
+            while select.select([listener], [], [], 0)[0] and process.poll() is None:
+                sleep(0.01)
+            activation_event(project, 'start', cold_start=perf_counter() - started_at)
+
+            first_response = None
+            last_active = perf_counter()
+            while process.poll() is None:
+                sleep(0.01 if first_response is None else 1)
+                size = _log_size()
+                if size != log_size:
+                    if first_response is None:
+                        first_response = perf_counter() - started_at
+                        activation_event(project, 'first response', first_response=first_response)
+                    log_size, last_active = size, perf_counter()
+                elif perf_counter() - last_active >= config['idle_timeout']:
+                    process.terminate()
+                    process.wait()
+                    activation_event(project, 'stop', uptime=perf_counter() - started_at)
+            if process.returncode not in (0, -signal.SIGTERM):
+                activation_event(project, 'exit', returncode=process.returncode)
+                # 시작하자마자 죽는 경우 연결을 계속 받아서 재시작을 반복하지 않도록
+                sleep(1)
+    finally:
+        if process and process.poll() is None:
+            process.terminate()
+            process.wait()
+        listener.close()
+
+
+def reopen_logs():
+    """
+    rotate된 로그 파일을 계속 쓰지 않도록 nginx와 gunicorn(capture_output의 stdout/stderr)이 파일을 다시 열게 함
+    log_handlers.QueueFileHandler는 파일이 바뀐 것을 감지해서 스스로 다시 엶
+    """
+    run('nginx -s reopen', capture_output=True)
+    for pid, (project, is_master) in gunicorn_processes().items():
+        if is_master:
+            try:
+                os.kill(pid, signal.SIGUSR1)
+            except ProcessLookupError:
+                pass
+
+
+def compress_log(path):
+    with open(path, 'rb') as f, gzip.open(f'{path}.gz.tmp', 'wb') as compressed:
+        shutil.copyfileobj(f, compressed)
+    os.replace(f'{path}.gz.tmp', f'{path}.gz')
+    os.remove(path)
+
+
+def rotate_logs():
+    """
+    LOG_ROTATE_GLOBS의 로그 중 LOG_ROTATE_MAX_BYTES보다 크거나 LOG_ROTATE_MAX_AGE가 지난 파일을
+    {path}.{시간}으로 옮긴 후 다시 열게 하고, 다음 확인때 gzip으로 압축 (그 사이에 남은 쓰기가 끝나도록)
+    압축된 파일은 LOG_ROTATE_BACKUPS개만 유지
+    """
+    rotated_at = {}
+    while True:
+        pending = [
+            path for pattern in LOG_ROTATE_GLOBS for path in glob(f'{pattern}.*')
+            if re.search(r'\.\d{14}$', path)
+        ]
+        rotated = []
+        for path in sorted(path for pattern in LOG_ROTATE_GLOBS for path in glob(pattern)):
+            rotated_at.setdefault(path, time())
+            size = os.path.getsize(path)
+            if size and (size >= LOG_ROTATE_MAX_BYTES or time() - rotated_at[path] >= LOG_ROTATE_MAX_AGE):
+                os.rename(path, f'{path}.{datetime.now():%Y%m%d%H%M%S}')
+                rotated_at[path] = time()
+                rotated.append(f'{os.path.basename(path)} ({size / 1024 / 1024:.1f}MB)')
+        if rotated:
+            reopen_logs()
+            print(f'Rotate logs: {", ".join(rotated)}', flush=True)
+
+        for path in pending:
+            compress_log(path)
+        backups = defaultdict(list)
+        for pattern in LOG_ROTATE_GLOBS:
+            for path in glob(f'{pattern}.*.gz'):
+                backups[path.rsplit('.', 2)[0]].append(path)
+        for paths in backups.values():
+            for path in sorted(paths)[:-LOG_ROTATE_BACKUPS]:
+                os.remove(path)
+        sleep(LOG_ROTATE_INTERVAL)
+
+
+def log_benchmark(records, threads=8):
+    """
+    여러 thread가 요청을 처리하며 로그를 남길때 호출 1회의 지연시간 (동기 FileHandler와 QueueFileHandler 비교)
+    """
+    import logging
+
+    from log_handlers import QueueFileHandler
+
+    message = 'x' * 300
+    print(f'{"handler":<10}{"p50":>12}{"p99":>12}{"max":>12}{"records/s":>12}{"dropped":>9}')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, handler_class in (('file', logging.FileHandler), ('queue', QueueFileHandler)):
+            handler = handler_class(os.path.join(tmp_dir, f'{name}.log'))
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger = logging.getLogger(f'benchmark.{name}')
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            logger.addHandler(handler)
+
+            latencies = []
+
+            def _log():
+                local = []
+                for _ in range(records // threads):
+                    # 요청 처리 사이에 로그를 남기는 상황
+                    sleep(0.0005)
+                    started_at = perf_counter()
+                    logger.info(message)
+                    local.append(perf_counter() - started_at)
+                latencies.extend(local)
+
+            started_at = perf_counter()
+            workers = [threading.Thread(target=_log) for _ in range(threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = perf_counter() - started_at
+            handler.close()
+            latencies.sort()
+            print(f'{name:<10}'
+                  f'{latencies[len(latencies) // 2] * 1e6:>10.1f}us'
+                  f'{latencies[int(len(latencies) * 0.99)] * 1e6:>10.1f}us'
+                  f'{latencies[-1] * 1e6:>10.1f}us'
+                  f'{len(latencies) / elapsed:>12.0f}'
+                  f'{getattr(handler, "dropped", 0):>9}')
+
+
+def refresh_secrets():
+    """
+    컨테이너 시작시 secret을 한 번 가져와서 스냅샷 저장 (각 프로젝트의 worker는 스냅샷을 사용)
+    """
+    from secrets_cache import SecretsCache, SECRETS_CACHE
+
+    started_at = perf_counter()
+    SECRETS_CACHE.refresh()
+    fetch_elapsed = perf_counter() - started_at
+
+    # worker 부팅시와 같은 조건(새 프로세스)에서 스냅샷 읽기
+    started_at = perf_counter()
+    cache = SecretsCache()
+    cache.get()
+    load_elapsed = perf_counter() - started_at
+    source = 'snapshot' if cache.stats['snapshot_hits'] else 'api (snapshot disabled)'
+    print(f'Secrets: fetch {fetch_elapsed * 1000:.0f}ms, worker load {load_elapsed * 1000:.1f}ms ({source})')
+
+
+def nginx_brotli():
+    """
+    nginx에 brotli_static을 제공하는 ngx_brotli module이 있는지 (Debian: libnginx-mod-http-brotli-static)
+    """
+    return bool(glob('/etc/nginx/modules-enabled/*brotli*'))
+
+
+def compress_static(static_root, brotli_static=False):
+    """
+    collectstatic 결과를 미리 .gz(및 nginx가 brotli_static을 지원하고 brotli가 설치된 경우 .br)로 압축
+    압축해도 작아지지 않으면 생략
+    """
+    original_bytes, compressed_bytes = 0, 0
+    for dirpath, dirnames, filenames in os.walk(static_root):
+        for filename in filenames:
+            if not filename.endswith(STATIC_COMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, filename)
+            with open(path, 'rb') as f:
+                content = f.read()
+            if len(content) < STATIC_COMPRESS_MIN_SIZE:
+                continue
+            original_bytes += len(content)
+            compressed_bytes += len(content)
+            variants = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli_static and brotli is not None:
+                variants.append(('.br', lambda data: brotli.compress(data, quality=11)))
+            for extension, compress in variants:
+                compressed = compress(content)
+                if len(compressed) >= len(content):
+                    continue
+                with open(path + extension, 'wb') as f:
+                    f.write(compressed)
+                if extension == '.gz':
+                    compressed_bytes -= len(content) - len(compressed)
+    return original_bytes, compressed_bytes
+
+
+def static_source_hash(project, project_path=None):
+    """
+    collectstatic 입력의 hash
+    프로젝트 내의 static 디렉터리(STATICFILES_DIRS, 앱의 static), 설치된 패키지의 static을 대신하는 requirements.txt,
+    결과를 바꾸는 설정(STATIC_ROOT, STATICFILES_*, STORAGES)을 대신하는 설정 module의 package 전체
+    """
+    digest = hashlib.sha256()
+    with open(requirements_path(project), 'rb') as f:
+        digest.update(f.read())
+    # .br 파일 생성 여부
+    digest.update(b'brotli' if nginx_brotli() and brotli is not None else b'')
+    project_path = project_path or os.path.join(os.sep, 'srv', project)
+    settings_path = os.path.join('app', *PROJECT_SETTINGS_MODULE.split('.')[:-1])
+    for dirpath, dirnames, filenames in os.walk(project_path):
+        dirnames[:] = sorted(
+            d for d in dirnames if d not in ('.static', '.media', '.git', 'node_modules', '__pycache__')
+        )
+        relpath = os.path.relpath(dirpath, project_path)
+        if 'static' not in relpath.split(os.sep) and not (relpath + os.sep).startswith(settings_path + os.sep):
+            continue
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            digest.update(os.path.relpath(path, project_path).encode())
+            digest.update(file_digest(path).encode())
+    return digest.hexdigest()
+
+
+# 프로젝트당 하나의 인터프리터에서 django.setup()을 한 번만 하고 필요한 명령만 실행
+DJANGO_COMMANDS_SCRIPT = '''
+import json
+import sys
+import time
+
+import django
+django.setup()
+
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+timings = {}
+if sys.argv[1] == '1':
+    started_at = time.perf_counter()
+    call_command('collectstatic', interactive=False, verbosity=0)
+    timings['collectstatic'] = time.perf_counter() - started_at
+
+# showmigrations --plan과 같은 기준으로, 적용되지 않은 migration이 있을때만 migrate
+started_at = time.perf_counter()
+executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+unapplied = executor.migration_plan(executor.loader.graph.leaf_nodes())
+timings['migration plan'] = time.perf_counter() - started_at
+if unapplied:
+    started_at = time.perf_counter()
+    call_command('migrate', interactive=False, verbosity=1)
+    timings['migrate'] = time.perf_counter() - started_at
+print(json.dumps({'timings': timings, 'unapplied': len(unapplied)}))
+'''
+
+
+def execute_project_commands(project):
+    """
+    static 입력이 이전 빌드와 같으면 STATIC_CACHE_DIR의 결과를 복사하고 collectstatic, 압축은 생략
+    (이미지 layer의 .static은 매 빌드마다 새로 압축을 푼 상태이므로 cache mount에 보관)
+    """
+    started_at = perf_counter()
+    static_root = os.path.join(os.sep, 'srv', project, '.static')
+    cache_dir = os.path.join(STATIC_CACHE_DIR, project)
+    hash_path = os.path.join(STATIC_CACHE_DIR, f'{project}.source-hash')
+    source_hash = static_source_hash(project)
+    try:
+        with open(hash_path, 'rt') as f:
+            collectstatic = f.read() != source_hash or not os.path.isdir(cache_dir)
+    except FileNotFoundError:
+        collectstatic = True
+    if not collectstatic:
+        shutil.copytree(cache_dir, static_root, dirs_exist_ok=True)
+
+    # 이미지 빌드 중에는 secret 스냅샷을 남기지 않음
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE=PROJECT_SETTINGS_MODULE,
+        PYTHONPATH=ROOT_DIR,
+        SECRETS_SNAPSHOT_PATH='',
+    )
+    result = subprocess.run(
+        [os.path.join(venv_path(project), 'bin', 'python3'), '-c', DJANGO_COMMANDS_SCRIPT, str(int(collectstatic))],
+        cwd=os.path.join(os.sep, 'srv', project, 'app'),
+        env=env, check=True, capture_output=True,
+    )
+    summary = json.loads(result.stdout.decode().strip().splitlines()[-1])
+
+    if collectstatic:
+        started_at_compress = perf_counter()
+        original_bytes, compressed_bytes = compress_static(static_root, brotli_static=nginx_brotli())
+        summary['timings']['compress static'] = perf_counter() - started_at_compress
+        summary['static'] = {'original': original_bytes, 'gzip': compressed_bytes}
+        if os.path.exists(cache_dir):
+            shutil.rmtree(cache_dir)
+        shutil.copytree(static_root, cache_dir)
+        with open(hash_path, 'wt') as f:
+            f.write(source_hash)
+    summary['collectstatic'] = collectstatic
+    summary['elapsed'] = perf_counter() - started_at
+    return summary
 
 
 def execute_django_commands():
-    os.chdir(ROOT_DIR)
-    for project in os.listdir(POETRY_DIR):
-        env = 'DJANGO_SETTINGS_MODULE=config.settings.production'
-        python = f'/srv/envs/env-{project}/bin/python3'
-        manage = f'/srv/{project}/app/manage.py'
-        run(f'{env} {python} {manage} collectstatic --noinput')
-        run(f'{env} {python} {manage} migrate --noinput')
+    """
+    프로젝트별 collectstatic(static 입력이 바뀐 경우), migrate(적용할 migration이 있는 경우)를 동시에 실행
+    """
+    started_at = perf_counter()
+    results = run_projects(execute_project_commands, get_projects())
+    print('Django commands')
+    for project, summary in sorted(results.items()):
+        steps = ', '.join(f'{name} {elapsed:.1f}s' for name, elapsed in summary['timings'].items())
+        print(f' - {project} ({summary["elapsed"]:.1f}s): {steps}'
+              f'{"" if summary["collectstatic"] else ", collectstatic skipped"}'
+              f'{"" if summary["unapplied"] else ", migrate skipped"}')
+    print(f' Total: {perf_counter() - started_at:.1f}s')
 
+    os.makedirs(os.path.join(ROOT_DIR, '.log'), exist_ok=True)
+    with open(os.path.join(ROOT_DIR, '.log', 'commands.json'), 'wt') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
 
-def db_backup():
-    os.chdir(ROOT_DIR)
-    for project in os.listdir(POETRY_DIR):
-        env = 'DJANGO_SETTINGS_MODULE=config.settings.production'
-        python = f'/srv/envs/env-{project}/bin/python3'
-        manage = f'/srv/{project}/app/manage.py'
-        run(f'{env} {python} {manage} dbbackup')
+
+DB_SETTINGS_SCRIPT = '''
+import json
+
+import django
+django.setup()
+
+from django.conf import settings
+print(json.dumps(settings.DATABASES['default'], default=str))
+'''
+
+
+class S3Upload:
+    """
+    S3 multipart upload (part는 5MB 이상, 마지막 part 제외)
+    client는 여러 thread에서 공유 (boto3 client는 thread-safe, client 생성은 thread-safe하지 않음)
+    """
+
+    def __init__(self, client, bucket, key):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.upload_id = self.client.create_multipart_upload(Bucket=bucket, Key=key)['UploadId']
+
+    def upload_part(self, number, data):
+        return self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=number, Body=data,
+        )['ETag']
+
+    def complete(self, etags):
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={'Parts': [{'PartNumber': number, 'ETag': etag} for number, etag in etags]},
+        )
+
+    def abort(self):
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+
+class LocalUpload:
+    """
+    S3Upload와 같은 방식으로 로컬 디렉토리에 저장 (file:// target, 로컬 테스트용)
+    """
+
+    def __init__(self, root, key):
+        self.path = os.path.join(root, key)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def upload_part(self, number, data):
+        with open(f'{self.path}.part{number}', 'wb') as f:
+            f.write(data)
+        return hashlib.md5(data).hexdigest()
+
+    def complete(self, etags):
+        with open(f'{self.path}.tmp', 'wb') as f:
+            for number, etag in etags:
+                with open(f'{self.path}.part{number}', 'rb') as part:
+                    shutil.copyfileobj(part, f)
+                os.remove(f'{self.path}.part{number}')
+        os.replace(f'{self.path}.tmp', self.path)
+
+    def abort(self):
+        directory, name = os.path.split(self.path)
+        for filename in os.listdir(directory):
+            if filename.startswith(f'{name}.part'):
+                os.remove(os.path.join(directory, filename))
+
+
+def open_upload(target, key, s3_client=None):
+    """
+    target: s3://bucket/prefix 또는 file:///path
+    """
+    scheme, _, location = target.partition('://')
+    root, _, prefix = location.partition('/')
+    if scheme == 's3':
+        return S3Upload(s3_client, root, '/'.join(filter(None, [prefix, key])))
+    if scheme == 'file':
+        return LocalUpload(os.sep + location.lstrip('/'), key)
+    raise ValueError(f'지원하지 않는 backup target: {target}')
+
+
+def stream_upload(chunks, upload, part_size=DB_BACKUP_PART_SIZE, workers=DB_BACKUP_UPLOAD_WORKERS):
+    """
+    chunks를 gzip으로 압축하면서 part_size마다 multipart upload
+    메모리에는 압축 버퍼와 업로드 중인 part(최대 workers개)만 유지 (디스크에 dump를 저장하지 않음)
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    slots = threading.BoundedSemaphore(workers)
+    stats = {'raw': 0, 'compressed': 0, 'parts': 0, 'peak_buffer': 0}
+    in_flight = [0]
+    lock = threading.Lock()
+    futures = []
+    buffer = bytearray()
+
+    def _upload(number, data):
+        try:
+            return number, upload.upload_part(number, data)
+        finally:
+            with lock:
+                in_flight[0] -= len(data)
+            slots.release()
+
+    def _submit(executor, data):
+        # 업로드 중인 part가 workers개면 하나가 끝날때까지 dump 읽기를 멈춤
+        slots.acquire()
+        for future in futures:
+            if future.done() and future.exception():
+                slots.release()
+                raise future.exception()
+        stats['parts'] += 1
+        stats['compressed'] += len(data)
+        with lock:
+            in_flight[0] += len(data)
+        futures.append(executor.submit(_upload, stats['parts'], data))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for chunk in chunks:
+                stats['raw'] += len(chunk)
+                buffer += compressor.compress(chunk)
+                with lock:
+                    stats['peak_buffer'] = max(stats['peak_buffer'], len(buffer) + in_flight[0])
+                while len(buffer) >= part_size:
+                    _submit(executor, bytes(buffer[:part_size]))
+                    del buffer[:part_size]
+            buffer += compressor.flush()
+            _submit(executor, bytes(buffer))
+            etags = sorted(future.result() for future in futures)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            upload.abort()
+            raise
+    upload.complete(etags)
+    return stats
+
+
+def postgresql_dump(database):
+    """
+    pg_dump의 출력을 chunk 단위로 읽음
+    """
+    env = dict(os.environ, PGPASSWORD=str(database.get('PASSWORD') or ''))
+    process = subprocess.Popen(
+        ['pg_dump', '--no-owner', '--no-privileges',
+         '-h', str(database.get('HOST') or 'localhost'), '-p', str(database.get('PORT') or 5432),
+         '-U', str(database.get('USER') or ''), database['NAME']],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+    )
+    try:
+        for chunk in iter(lambda: process.stdout.read(DB_BACKUP_READ_SIZE), b''):
+            yield chunk
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, 'pg_dump', stderr=stderr)
+
+
+def sqlite_dump(database):
+    """
+    SQLite의 SQL dump를 chunk 단위로 모음 (읽기 전용 연결)
+    """
+    connection = sqlite3.connect(f'file:{database["NAME"]}?mode=ro', uri=True)
+    try:
+        chunk = []
+        size = 0
+        for line in connection.iterdump():
+            chunk.append(line)
+            size += len(line) + 1
+            if size >= DB_BACKUP_READ_SIZE:
+                yield ('\n'.join(chunk) + '\n').encode()
+                chunk, size = [], 0
+        if chunk:
+            yield ('\n'.join(chunk) + '\n').encode()
+    finally:
+        connection.close()
+
+
+def db_fingerprint(database):
+    """
+    마지막 백업 이후 변경 여부를 확인하기 위한 값 (dump보다 훨씬 가벼운 조회)
+    PostgreSQL: 테이블별 insert/update/delete 누적 횟수, SQLite: 파일 크기와 수정시간
+    """
+    if 'sqlite' in database['ENGINE']:
+        paths = [database['NAME']] + [f'{database["NAME"]}-wal']
+        values = [(os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in paths if os.path.exists(path)]
+        return hashlib.sha256(json.dumps(values).encode()).hexdigest()
+    result = subprocess.run(
+        ['psql', '-At',
+         '-h', str(database.get('HOST') or 'localhost'), '-p', str(database.get('PORT') or 5432),
+         '-U', str(database.get('USER') or ''), '-d', database['NAME'],
+         '-c', 'SELECT relid, n_tup_ins, n_tup_upd, n_tup_del FROM pg_stat_user_tables ORDER BY relid'],
+        env=dict(os.environ, PGPASSWORD=str(database.get('PASSWORD') or '')),
+        check=True, capture_output=True,
+    )
+    return hashlib.sha256(result.stdout).hexdigest()
+
+
+def project_env():
+    return dict(os.environ, DJANGO_SETTINGS_MODULE=PROJECT_SETTINGS_MODULE, PYTHONPATH=ROOT_DIR)
+
+
+def project_database(project):
+    result = subprocess.run(
+        [os.path.join(venv_path(project), 'bin', 'python3'), '-c', DB_SETTINGS_SCRIPT],
+        cwd=os.path.join(os.sep, 'srv', project, 'app'),
+        env=project_env(),
+        check=True, capture_output=True,
+    )
+    return json.loads(result.stdout.decode().strip().splitlines()[-1])
+
+
+def dbbackup_project(project):
+    """
+    backup_target이 없는 프로젝트는 프로젝트의 django-dbbackup 설정(DBBACKUP_STORAGE 등)으로 백업
+    """
+    started_at = perf_counter()
+    subprocess.run(
+        [os.path.join(venv_path(project), 'bin', 'python3'), os.path.join(os.sep, 'srv', project, 'app', 'manage.py'),
+         'dbbackup'],
+        env=project_env(),
+        check=True, capture_output=True,
+    )
+    return {'skipped': False, 'dbbackup': True, 'elapsed': perf_counter() - started_at}
+
+
+def backup_project(project, target, state, s3_client=None):
+    """
+    dump → gzip → multipart upload를 파이프라인으로 처리, fingerprint가 같으면 건너뜀
+    """
+    if not target:
+        return dbbackup_project(project)
+    started_at = perf_counter()
+    database = project_database(project)
+    fingerprint = db_fingerprint(database)
+    if state.get(project, {}).get('fingerprint') == fingerprint:
+        return {'skipped': True, 'key': state[project]['key'], 'elapsed': perf_counter() - started_at}
+
+    engine = 'sqlite' if 'sqlite' in database['ENGINE'] else 'postgresql'
+    key = f'{project}/{datetime.now():%Y%m%d%H%M%S}.{engine}.sql.gz'
+    dump = sqlite_dump(database) if engine == 'sqlite' else postgresql_dump(database)
+    stats = stream_upload(dump, open_upload(target, key, s3_client))
+    return dict(stats, skipped=False, key=key, fingerprint=fingerprint, elapsed=perf_counter() - started_at)
+
+
+def db_backup(target=None):
+    """
+    프로젝트별 DB를 동시에(DB_BACKUP_WORKERS개까지) 백업
+    target의 기본값은 projects.json의 프로젝트별 backup_target, 둘 다 없으면 manage.py dbbackup
+    """
+    projects = get_projects()
+    state = {}
+    try:
+        with open(DB_BACKUP_STATE_PATH, 'rt') as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        pass
+
+    targets = {project: target or project_config(project)['backup_target'] for project in projects}
+    s3_client = None
+    if any(target and target.startswith('s3://') for target in targets.values()):
+        import boto3
+
+        # 기본 session으로 client를 만드는 것은 thread-safe하지 않으므로 worker를 시작하기 전에 하나만 만들어서 공유
+        s3_client = boto3.session.Session().client('s3')
+
+    print('DB backup')
+    started_at = perf_counter()
+    results = run_projects(
+        lambda project: backup_project(project, targets[project], state, s3_client),
+        projects,
+        workers=DB_BACKUP_WORKERS,
+    )
+    for project, result in sorted(results.items()):
+        if result['skipped']:
+            print(f' - {project}: unchanged, skipped (last: {result["key"]})')
+            continue
+        if result.get('dbbackup'):
+            print(f' - {project}: manage.py dbbackup ({result["elapsed"]:.1f}s)')
+            continue
+        state[project] = {'fingerprint': result['fingerprint'], 'key': result['key']}
+        print(f' - {project}: {result["key"]} {result["raw"] / 1024 / 1024:.1f}MB → '
+              f'{result["compressed"] / 1024 / 1024:.1f}MB, {result["parts"]} parts, '
+              f'{result["raw"] / 1024 / 1024 / result["elapsed"]:.1f}MB/s, '
+              f'peak buffer {result["peak_buffer"] / 1024 / 1024:.1f}MB ({result["elapsed"]:.1f}s)')
+    os.makedirs(os.path.dirname(DB_BACKUP_STATE_PATH), exist_ok=True)
+    with open(DB_BACKUP_STATE_PATH, 'wt') as f:
+        json.dump(state, f, indent=2)
+    print(f' Total: {perf_counter() - started_at:.1f}s, '
+          f'peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}MB')
 
 
 if __name__ == '__main__':
+    if args.venv_groups:
+        print_venv_groups()
+
     if args.install:
-        install()
+        install(get_projects(), wheelhouse=args.wheelhouse, offline=args.offline, share=args.share_venvs)
 
     if args.unarchive:
         unarchive()
@@ -93,3 +1609,36 @@ if __name__ == '__main__':
 
     if args.db:
         db_backup()
+
+    if args.secrets:
+        refresh_secrets()
+
+    if args.gunicorn:
+        gunicorn(dry_run=args.dry_run)
+
+    if args.measure:
+        measure()
+
+    if args.activate:
+        activate(args.activate)
+
+    if args.rotate_logs:
+        rotate_logs()
+
+    if args.log_benchmark:
+        log_benchmark(args.log_benchmark)
+
+    if args.cache_benchmark:
+        cache_benchmark(args.cache_benchmark)
+
+    if args.health_benchmark:
+        health_benchmark(args.health_benchmark)
+
+    if args.static_benchmark:
+        static_benchmark()
+
+    if args.nginx_benchmark:
+        nginx_benchmark(args.nginx_benchmark)
+
+    if args.celery_benchmark:
+        celery_benchmark(args.celery_benchmark)
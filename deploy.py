@@ -1,22 +1,53 @@
 #!/usr/bin/env python
 import argparse
+import fnmatch
+import hashlib
+import io
 import json
 import os
+import random
+import re
+import resource
 import shutil
 import subprocess
+import tarfile
+import tempfile
+import threading
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from json import JSONDecodeError
 from pathlib import Path
-from time import sleep
+from time import perf_counter, thread_time
 
 import boto3
 from PyInquirer import prompt
 
+from secrets_cache import SecretsCache
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 parser = argparse.ArgumentParser()
 parser.add_argument('--build', action='store_true')
 parser.add_argument('--run', action='store_true')
 parser.add_argument('--bash', action='store_true')
 parser.add_argument('--ci', action='store_true')
+parser.add_argument('--clean', action='store_true', help='빌드 캐시(.poetry, .archive)를 지우고 전체 빌드')
+parser.add_argument('--codec', choices=('gzip', 'zstd', 'tar'), default='gzip', help='프로젝트 archive 압축 방식')
+parser.add_argument('--archive-benchmark', action='store_true', help='codec별 archive 크기/소요시간 비교')
+parser.add_argument('--pull', action='store_true', help='docker build시 base image를 항상 pull')
+parser.add_argument('--context', action='store_true', help='docker build 없이 build context만 생성해서 파일 목록과 hash 출력')
+parser.add_argument('--resume', action='store_true', help='중단된 EB 배포를 마지막으로 완료된 단계 이후부터 재개')
+parser.add_argument('--rollback', action='store_true', help='중단된 EB 배포를 되돌림 (새 Environment 종료, CNAME 복구)')
+parser.add_argument('--terminate-orphans', action='store_true', help='중단된 배포가 남긴 blue/green Environment를 확인없이 terminate')
+parser.add_argument('--history', action='store_true', help='이전 배포들의 단계별 소요시간 출력')
 args = parser.parse_args()
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -24,6 +55,29 @@ PROJECTS_DIR = os.path.join(ROOT_DIR, 'projects')
 ARCHIVE_DIR = os.path.join(ROOT_DIR, '.archive')
 POETRY_DIR = os.path.join(ROOT_DIR, '.poetry')
 VOLUME_ENVS_DIR = os.path.join(ROOT_DIR, '.envs')
+BUILD_MANIFEST_PATH = os.path.join(ARCHIVE_DIR, 'manifest.json')
+BUILD_DIR = os.path.join(ROOT_DIR, '.build')
+DOCKERFILE_PATH = os.path.join(BUILD_DIR, 'Dockerfile')
+CONTEXT_PATH = os.path.join(BUILD_DIR, 'context.tar')
+# build context에 포함되는 root의 파일/디렉토리 (Dockerfile에서 COPY하는 것만)
+CONTEXT_FILES = ('requirements.txt', 'venvs.py', 'container.py', 'secrets_cache.py', 'log_handlers.py', '.config')
+CONTEXT_MTIME = 0
+DEPLOY_DIR = os.path.join(ROOT_DIR, '.deploy')
+DEPLOY_JOURNAL_PATH = os.path.join(DEPLOY_DIR, 'journal.json')
+DEPLOY_HISTORY_PATH = os.path.join(DEPLOY_DIR, 'history.jsonl')
+TRACE_DIR = os.path.join(DEPLOY_DIR, 'traces')
+
+# export/archive를 동시에 실행할 최대 프로젝트 수
+EXPORT_WORKERS = min(4, os.cpu_count() or 1)
+
+# Archive
+ARCHIVE_CODEC = args.codec
+ARCHIVE_EXTENSIONS = {
+    'gzip': '.tar.gz',
+    'zstd': '.tar.zst',
+    'tar': '.tar',
+}
+ARCHIVE_EXCLUDES = ('.git', 'node_modules', '__pycache__', '*.pyc', '.DS_Store')
 
 AWS_PROFILE_SECRETS = 'lhy-secrets-manager'
 AWS_PROFILE_EB = 'eb-deploy-base'
@@ -80,9 +134,319 @@ RUN_CMD = 'docker run --rm -it {options}'.format(
     options=' '.join([option for option in RUN_OPTIONS])
 )
 
+# Dockerfile (DeployUtil.generate_dockerfile)
+# base → deps(프로젝트별 의존성 layer) → app(프로젝트별 소스 layer, 설정) 순서로,
+# 자주 바뀌는 것일수록 뒤에 위치해서 앞쪽 layer의 캐시가 유지됨
+DOCKERFILE_BASE = '''# syntax=docker/dockerfile:1
+# deploy.py로 생성됨
+FROM        python:3.8-slim AS base
+ENV         LANG C.UTF-8
+
+# eb-deploy packages & directories
+RUN         apt -y update &&\\
+            apt -y dist-upgrade &&\\
+            apt -y install nginx procps htop net-tools && \\
+            apt -y install supervisor gcc vim cron zstd redis-server postgresql-client && \\
+            apt -y autoremove
+RUN         mkdir /var/log/gunicorn /var/log/celery
+
+# eb-deploy requirements
+COPY        requirements.txt           /tmp/requirements.txt
+# cryptography: secret 디스크 스냅샷 암호화 (secrets_cache.py)
+RUN         --mount=type=cache,target=/root/.cache/pip \\
+            pip3 install -r /tmp/requirements.txt 'cryptography>=3.4'
+
+RUN         mkdir -p /srv/project/.log
+WORKDIR     /srv/project
+COPY        venvs.py                /srv/project/
+
+
+# Projects venvs (변경이 적은 프로젝트부터)
+FROM        base AS deps
+'''
+DOCKERFILE_DEPS_COPY = '''COPY        .poetry/{project}/requirements.txt /srv/project/.poetry/{project}/requirements.txt
+'''
+DOCKERFILE_DEPS = '''RUN         --mount=type=cache,target=/root/.cache/pip \\
+            --mount=type=cache,target=/srv/project/.wheelhouse \\
+            ./venvs.py --wheelhouse --share-venvs --projects {projects}
+'''
+DOCKERFILE_APP = '''
+
+# venv간 동일한 파일을 hardlink로 공유 (그룹별 layer 사이에는 hardlink가 유지되지 않으므로 한 stage에 모아서 실행)
+FROM        base AS envs
+COPY        --from=deps /srv/envs /srv/envs
+RUN         ./venvs.py --dedupe
+
+
+# Unarchive projects (container.py는 의존성 layer 뒤에서 COPY)
+FROM        base AS app
+COPY        --from=envs /srv/envs /srv/envs
+COPY        --from=deps /srv/project/.poetry /srv/project/.poetry
+COPY        container.py            /srv/project/
+'''
+DOCKERFILE_SOURCE = '''COPY        .archive/{archive} /srv/project/.archive/{archive}
+RUN         ./container.py --unarchive --projects {project}
+'''
+DOCKERFILE_CONFIG = '''
+# Config
+COPY        secrets_cache.py        /srv/project/
+COPY        log_handlers.py         /srv/project/
+COPY        .config                 /srv/project/.config
+
+# Nginx config
+RUN         rm -rf  /etc/nginx/sites-available/* &&\\
+            rm -rf  /etc/nginx/sites-enabled/* &&\\
+            cp -a   /srv/project/.config/nginx*.conf \\
+                    /etc/nginx/conf.d/
+RUN         python3 /srv/project/container.py --nginx
+RUN         python3 /srv/project/container.py --supervisor
+
+# AWS Secrets
+ARG         AWS_ACCESS_KEY_ID
+ARG         AWS_SECRET_ACCESS_KEY
+ARG         AWS_SECRETS_MANAGER_ACCESS_KEY_ID
+ARG         AWS_SECRETS_MANAGER_SECRET_ACCESS_KEY
+
+ENV         AWS_ACCESS_KEY_ID=$AWS_ACCESS_KEY_ID
+ENV         AWS_SECRET_ACCESS_KEY=$AWS_SECRET_ACCESS_KEY
+ENV         AWS_SECRETS_MANAGER_ACCESS_KEY_ID=$AWS_SECRETS_MANAGER_ACCESS_KEY_ID
+ENV         AWS_SECRETS_MANAGER_SECRET_ACCESS_KEY=$AWS_SECRETS_MANAGER_SECRET_ACCESS_KEY
+
+# collectstatic, migrate (static 입력이 같으면 이전 빌드의 collectstatic 결과 재사용)
+RUN         --mount=type=cache,target=/srv/project/.static-cache,sharing=locked \\
+            python3 /srv/project/container.py --command
+
+# supervisord
+CMD         python3 /srv/project/container.py --secrets --gunicorn --nginx && \\
+            exec supervisord -c /srv/project/.config/supervisord.conf -n
+EXPOSE      80
+'''
+
+
+class Tracer:
+    """
+    배포 단계별 span 기록
+    각 span은 wall time, CPU time(현재 thread + 그 동안 종료된 자식 프로세스), 종료 코드, 생성한 bytes를 가짐
+    자식 프로세스의 CPU time은 프로세스 전체 기준이므로 동시에 실행되는 span끼리는 겹쳐서 기록될 수 있음
+    """
+
+    def __init__(self):
+        self.id = datetime.now().strftime('%Y%m%d%H%M%S')
+        self.started_at = datetime.now(timezone.utc)
+        self.origin = perf_counter()
+        self.spans = []
+        self.attributes = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._next_id = 0
+
+    def current(self):
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name, parent=None, **attributes):
+        """
+        with TRACER.span('name') as span:
+            span['bytes'] = ...
+        다른 thread에서 실행되는 span은 parent를 직접 지정
+        """
+        stack = self._local.__dict__.setdefault('stack', [])
+        parent = parent or self.current()
+        with self._lock:
+            self._next_id += 1
+            span_id = self._next_id
+        record = {
+            'id': span_id,
+            'parent': parent['id'] if parent else None,
+            'name': name,
+            'thread': threading.current_thread().name,
+            'start': perf_counter() - self.origin,
+            **attributes,
+        }
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu = thread_time()
+        stack.append(record)
+        try:
+            yield record
+            record.setdefault('status', 'ok')
+        except BaseException as e:
+            record['status'] = 'error'
+            record['error'] = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            stack.pop()
+            children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            record['wall'] = perf_counter() - self.origin - record['start']
+            record['cpu'] = (thread_time() - cpu) + (
+                children_after.ru_utime - children.ru_utime + children_after.ru_stime - children.ru_stime
+            )
+            with self._lock:
+                self.spans.append(record)
+
+    def finish(self, status):
+        """
+        span 목록을 JSON lines와 Chrome trace(chrome://tracing, Perfetto) 형식으로 저장하고
+        배포 기록(history)에 최상위 span별 소요시간 추가
+        """
+        if not self.spans:
+            return
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        spans = sorted(self.spans, key=lambda span: span['start'])
+        jsonl_path = os.path.join(TRACE_DIR, f'{self.id}.jsonl')
+        with open(jsonl_path, 'wt') as f:
+            for span in spans:
+                f.write(json.dumps(span, default=str) + '\n')
+
+        threads = {}
+        events = []
+        for span in spans:
+            tid = threads.setdefault(span['thread'], len(threads) + 1)
+            events.append({
+                'name': span['name'],
+                'ph': 'X',
+                'pid': 1,
+                'tid': tid,
+                'ts': round(span['start'] * 1e6),
+                'dur': round(span['wall'] * 1e6),
+                'args': {key: value for key, value in span.items() if key not in ('name', 'start', 'wall', 'thread')},
+            })
+        events.extend(
+            {'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': name}}
+            for name, tid in threads.items()
+        )
+        chrome_path = os.path.join(TRACE_DIR, f'{self.id}.trace.json')
+        with open(chrome_path, 'wt') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+
+        roots = [span for span in spans if span['parent'] is None]
+        with open(DEPLOY_HISTORY_PATH, 'at') as f:
+            f.write(json.dumps({
+                'id': self.id,
+                'started_at': self.started_at.isoformat(),
+                'status': status,
+                'total': sum(span['wall'] for span in roots),
+                'stages': {span['name']: round(span['wall'], 3) for span in roots},
+                **self.attributes,
+            }, default=str) + '\n')
+        print(f'Trace: {jsonl_path}, {chrome_path}')
+
+
+TRACER = Tracer()
+
 
 def run(cmd, **kwargs):
-    subprocess.run(cmd, shell=True, env=ENV, **kwargs)
+    """
+    종료 코드가 0이 아니면 CalledProcessError (check=False로 무시)
+    """
+    kwargs.setdefault('check', True)
+    # 명령어 전체에는 인증정보가 포함될 수 있으므로 앞부분만 기록
+    with TRACER.span('run', cmd=' '.join(cmd.split()[:3])) as span:
+        try:
+            result = subprocess.run(cmd, shell=True, env=ENV, **kwargs)
+        except subprocess.CalledProcessError as e:
+            span['returncode'] = e.returncode
+            raise
+        span['returncode'] = result.returncode
+        if isinstance(result.stdout, bytes):
+            span['bytes'] = len(result.stdout)
+        return result
+
+
+class ParallelGzipWriter:
+    """
+    BLOCK_SIZE 단위의 블록을 여러 스레드에서 압축하는 gzip writer
+    각 블록은 독립된 gzip member이며, 이어붙인 결과도 그대로 gzip/tar로 해제 가능
+    블록 경계가 입력에 의해서만 결정되므로 스레드 수와 관계없이 같은 결과가 나옴
+    """
+    BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, fileobj, level=6, workers=None):
+        self.fileobj = fileobj
+        self.level = level
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.pending = deque()
+        self.buffer = bytearray()
+
+    def _compress(self, block):
+        # wbits 31: gzip header (mtime 0)
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressor.compress(block) + compressor.flush()
+
+    def _submit(self, block):
+        self.pending.append(self.executor.submit(self._compress, block))
+        # 압축 대기중인 블록 수를 제한해서 메모리 사용량을 일정하게 유지
+        while len(self.pending) > self.workers * 2:
+            self.fileobj.write(self.pending.popleft().result())
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.BLOCK_SIZE:
+            self._submit(bytes(self.buffer[:self.BLOCK_SIZE]))
+            del self.buffer[:self.BLOCK_SIZE]
+        return len(data)
+
+    def close(self):
+        if self.buffer:
+            self._submit(bytes(self.buffer))
+            self.buffer.clear()
+        while self.pending:
+            self.fileobj.write(self.pending.popleft().result())
+        self.executor.shutdown()
+
+
+def normalize_tarinfo(info, mtime):
+    """
+    소유자, 권한, 수정시간 정규화 (실행 권한 여부만 유지)
+    """
+    info.uid = info.gid = 0
+    info.uname = info.gname = ''
+    info.mtime = mtime
+    if info.isdir() or info.mode & 0o111:
+        info.mode = 0o755
+    else:
+        info.mode = 0o644
+    return info
+
+
+class HashingWriter:
+    """
+    쓰여지는 데이터의 sha256과 크기를 기록하면서 fileobj에 전달
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+
+def archive_writer(fileobj, codec):
+    if codec == 'gzip':
+        return ParallelGzipWriter(fileobj)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise Exception('zstd codec을 사용하려면 zstandard 패키지가 필요합니다')
+        # 멀티스레드 zstd의 결과는 스레드 수와 관계없이 동일
+        return zstandard.ZstdCompressor(level=10, threads=-1).stream_writer(fileobj, closefd=False)
+    return fileobj
+
+
+@dataclass
+class BuildResult:
+    key: dict
+    # 재빌드한 경우 그 사유, 캐시를 사용한 경우 None
+    requirements: str = None
+    archive: str = None
+    elapsed: float = 0
 
 
 @dataclass
@@ -92,14 +456,153 @@ class Project:
     def __repr__(self):
         return f'Project({self.name})'
 
+    def git(self, cmd):
+        return run(f'git {cmd}', cwd=self.repo_path, check=True, capture_output=True).stdout.decode().strip()
+
+    def build_key(self):
+        """
+        빌드 캐시 키 (git tree hash, poetry.lock digest, 커밋되지 않은 변경 여부)
+        """
+        with open(self.lock_path, 'rb') as f:
+            lock_digest = hashlib.sha256(f.read()).hexdigest()
+        return {
+            'tree': self.git('rev-parse "HEAD^{tree}"'),
+            'lock': lock_digest,
+            'dirty': bool(self.git('status --porcelain')),
+        }
+
+    def rebuild_reasons(self, key, cached):
+        """
+        requirements, archive 각각의 재빌드 사유 (캐시 사용 가능하면 None)
+        """
+        if not cached:
+            return 'new project', 'new project'
+        if key['dirty'] or cached.get('dirty'):
+            # 이전 빌드나 현재 작업트리에 커밋되지 않은 변경이 있으면 tree hash를 신뢰할 수 없음
+            return 'uncommitted changes', 'uncommitted changes'
+
+        requirements_reason = archive_reason = None
+        if cached.get('lock') != key['lock']:
+            requirements_reason = 'poetry.lock changed'
+        elif not os.path.exists(self.requirements_path):
+            requirements_reason = 'requirements.txt missing'
+        if cached.get('tree') != key['tree']:
+            archive_reason = 'git tree changed'
+        elif not os.path.exists(self.archive_file_path):
+            archive_reason = 'archive missing'
+        return requirements_reason, archive_reason
+
     def export_requirements(self):
-        os.chdir(self.repo_path)
         os.makedirs(self.poetry_path, exist_ok=True)
-        run(f'poetry export -f requirements.txt > {self.requirements_path}')
+        run(f'poetry export -f requirements.txt > {self.requirements_path}',
+            cwd=self.repo_path, check=True, capture_output=True)
 
-    def archive(self):
-        os.chdir(PROJECTS_DIR)
-        run(f'tar cfvz {self.archive_file_path} {self.name}')
+    def archive_excludes(self):
+        """
+        기본 제외 패턴 + 프로젝트의 .dockerignore 패턴 (예외 패턴 '!'은 지원하지 않음)
+        """
+        patterns = list(ARCHIVE_EXCLUDES)
+        try:
+            with open(os.path.join(self.repo_path, '.dockerignore'), 'rt') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and line[0] not in '#!':
+                        patterns.append(line.strip('/').replace('**/', ''))
+        except FileNotFoundError:
+            pass
+        return patterns
+
+    def archive_members(self):
+        """
+        archive에 포함될 (경로, archive내 이름)을 정렬된 순서로 반환
+        git이 추적하거나 .gitignore로 제외되지 않은 파일 중 제외 패턴에 해당하지 않는 파일과, 그 상위 디렉토리
+        (빌드 캐시 키의 git status와 같은 기준이므로 무시된 파일(.venv, .env 등)은 포함되지 않음)
+        """
+        patterns = self.archive_excludes()
+
+        def _excluded(relpath):
+            parts = relpath.split('/')
+            for index, name in enumerate(parts, 1):
+                partial = '/'.join(parts[:index])
+                if any(fnmatch.fnmatch(partial, p) or fnmatch.fnmatch(name, p) for p in patterns):
+                    return True
+            return False
+
+        files = set()
+        for relpath in self.git('ls-files -z --cached --others --exclude-standard').split('\0'):
+            path = os.path.join(self.repo_path, relpath)
+            # 커밋되지 않은 삭제, 하위 submodule(디렉토리)은 제외
+            if not relpath or _excluded(relpath) or not os.path.lexists(path):
+                continue
+            if os.path.isdir(path) and not os.path.islink(path):
+                continue
+            files.add(relpath)
+        directories = {
+            '/'.join(relpath.split('/')[:index])
+            for relpath in files
+            for index in range(1, relpath.count('/') + 1)
+        }
+
+        yield self.repo_path, self.name
+        for relpath in sorted(files | directories, key=lambda relpath: relpath.split('/')):
+            yield os.path.join(self.repo_path, relpath), os.path.join(self.name, relpath)
+
+    def archive(self, codec=None, path=None):
+        """
+        재현 가능한(byte-reproducible) archive 생성
+        파일 순서, 소유자, 권한, 수정시간을 정규화 (수정시간은 마지막 커밋 시간)
+        """
+        codec = codec or ARCHIVE_CODEC
+        path = path or self.archive_path(codec)
+        mtime = int(self.git('log -1 --format=%ct') or 0)
+
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            writer = archive_writer(f, codec)
+            with tarfile.open(fileobj=writer, mode='w|', format=tarfile.GNU_FORMAT) as tar:
+                for member_path, arcname in self.archive_members():
+                    info = normalize_tarinfo(tar.gettarinfo(member_path, arcname), mtime)
+                    if info.isreg():
+                        with open(member_path, 'rb') as member:
+                            tar.addfile(info, member)
+                    else:
+                        tar.addfile(info)
+            if writer is not f:
+                writer.close()
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    def export(self, cached=None, parent=None):
+        """
+        변경된 경우에만 requirements export 및 archive
+        """
+        started_at = perf_counter()
+        with TRACER.span(f'export {self.name}', parent=parent, project=self.name):
+            key = self.build_key()
+            requirements_reason, archive_reason = self.rebuild_reasons(key, cached)
+            if requirements_reason:
+                with TRACER.span('requirements', reason=requirements_reason) as span:
+                    self.export_requirements()
+                    span['bytes'] = os.path.getsize(self.requirements_path)
+            if archive_reason:
+                with TRACER.span('archive', reason=archive_reason, codec=ARCHIVE_CODEC) as span:
+                    span['bytes'] = self.archive()
+        return BuildResult(
+            key=key,
+            requirements=requirements_reason,
+            archive=archive_reason,
+            elapsed=perf_counter() - started_at,
+        )
+
+    def lock_changes(self):
+        """
+        poetry.lock을 변경한 커밋 수 (의존성이 바뀌는 빈도)
+        """
+        return int(self.git('rev-list --count HEAD -- poetry.lock') or 0)
+
+    @property
+    def lock_path(self):
+        return os.path.join(self.repo_path, 'poetry.lock')
 
     @property
     def repo_path(self):
@@ -113,9 +616,12 @@ class Project:
     def requirements_path(self):
         return os.path.join(self.poetry_path, 'requirements.txt')
 
+    def archive_path(self, codec):
+        return os.path.join(ARCHIVE_DIR, f'{self.name}{ARCHIVE_EXTENSIONS[codec]}')
+
     @property
     def archive_file_path(self):
-        return os.path.join(ARCHIVE_DIR, f'{self.name}.tar.gz')
+        return self.archive_path(ARCHIVE_CODEC)
 
     @property
     def deploy_venv_path(self):
@@ -134,25 +640,125 @@ class Project:
         return os.path.join(self.deploy_project_path, 'app', 'manage.py')
 
 
+class DeployJournal:
+    """
+    EB 배포의 단계별 상태를 기록하는 파일
+    중단된 배포는 기록된 상태로부터 resume 또는 rollback
+    """
+    STATUS_RUNNING, STATUS_FAILED, STATUS_FINISHED, STATUS_ROLLED_BACK = (
+        'running', 'failed', 'finished', 'rolled_back',
+    )
+
+    def __init__(self, path=DEPLOY_JOURNAL_PATH):
+        self.path = path
+        try:
+            with open(path, 'rt') as f:
+                self.data = json.load(f)
+        except (FileNotFoundError, JSONDecodeError):
+            self.data = None
+
+    @property
+    def active(self):
+        """
+        완료되지 않은(실행중 또는 실패한) 배포가 있는지 여부
+        """
+        return bool(self.data) and self.data['status'] in (self.STATUS_RUNNING, self.STATUS_FAILED)
+
+    @property
+    def state(self):
+        return self.data['state']
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'wt') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def start(self, state):
+        now = datetime.now(timezone.utc).isoformat()
+        self.data = {
+            'id': datetime.now().strftime('%Y%m%d%H%M%S'),
+            'status': self.STATUS_RUNNING,
+            'started_at': now,
+            'updated_at': now,
+            'state': state,
+            'steps': {},
+        }
+        self.save()
+
+    def step_status(self, step):
+        return self.data['steps'].get(step, {}).get('status')
+
+    def update(self, step, status, state=None, error=None):
+        self.data['steps'][step] = {'status': status, 'at': datetime.now(timezone.utc).isoformat()}
+        if error is not None:
+            self.data['steps'][step]['error'] = str(error)
+        if state is not None:
+            self.data['state'] = state
+        self.data['status'] = self.STATUS_FAILED if status == self.STATUS_FAILED else self.STATUS_RUNNING
+        self.data['updated_at'] = datetime.now(timezone.utc).isoformat()
+        self.save()
+
+    def finish(self, status):
+        self.data['status'] = status
+        self.data['updated_at'] = datetime.now(timezone.utc).isoformat()
+        self.save()
+
+
 class AWSUtil:
     CNAME_PREFIX = 'eb-deploy-base.'
     ENV_NAME_GREEN = 'eb-deploy-base-green'
     ENV_NAME_BLUE = 'eb-deploy-base-blue'
+    APPLICATION_NAME = 'eb-deploy-base'
+    PLATFORM = 'Docker 19.03.6-ce'
+    SERVICE_ROLE = 'aws-elasticbeanstalk-service-role'
+    INSTANCE_PROFILE = 'aws-elasticbeanstalk-ec2-role'
+    EC2_KEY_NAME = 'lhy2020'
+    SOURCE_BUNDLE = ('Dockerfile', '.ebextensions')
+
+    # 배포 단계 (각 단계가 끝날때마다 DeployJournal에 기록)
+    STEPS = (STEP_CREATE, STEP_SETTINGS, STEP_WAIT_HEALTHY, STEP_SWAP, STEP_TERMINATE) = (
+        'create', 'settings', 'wait healthy', 'swap', 'terminate',
+    )
+    # DeployJournal에 기록되는 상태
+    STATE_ATTRIBUTES = (
+        'is_first', 'swap_cname', 'running_environment_name', 'swap_environment_name',
+        'swap_target_group_arn', 'version_label',
+    )
 
-    def __init__(self):
+    # 상태 대기 (초)
+    WAIT_TIMEOUT = 30 * 60
+    WAIT_INITIAL_DELAY = 2
+    WAIT_MAX_DELAY = 30
+
+    def __init__(self, eb_client=None, elb_client=None, s3_client=None, acm_arn=None, journal=None,
+                 terminate_orphans=False, interactive=True):
         self.is_first = False
         self.swap_cname = 'eb-deploy-base-swap'
-        self.eb_client = boto3.client('elasticbeanstalk', region_name=AWS_REGION)
-        self.elb_client = boto3.client('elbv2', region_name=AWS_REGION)
-        self.ec2_client = boto3.client('ec2', region_name=AWS_REGION)
-        self.sm_client = SESSION_SECRETS.client('secretsmanager', region_name=AWS_REGION)
-        self.acm_arn = json.loads(
-            self.sm_client.get_secret_value(
-                SecretId='lhy'
-            )['SecretString'])['eb-deploy-base']['base']['AWS_ACM_ARN']
+        # 로컬 테스트시에는 같은 메서드를 구현한 대체 client를 사용
+        self.eb_client = eb_client or boto3.client('elasticbeanstalk', region_name=AWS_REGION)
+        self.elb_client = elb_client or boto3.client('elbv2', region_name=AWS_REGION)
+        self.s3_client = s3_client or boto3.client('s3', region_name=AWS_REGION)
+        if acm_arn is None:
+            # 배포하는 곳(local, CI)에는 스냅샷을 남기지 않음
+            secrets = SecretsCache(
+                snapshot_path='',
+                client_factory=lambda: SESSION_SECRETS.client('secretsmanager', region_name=AWS_REGION),
+            )
+            acm_arn = secrets.section('eb-deploy-base:base')['AWS_ACM_ARN']
+        self.acm_arn = acm_arn
         self.running_environment = None
         self.running_environment_name = None
         self.swap_environment_name = None
+        self.swap_target_group_arn = None
+        self.version_label = None
+        self.orphan_environments = []
+        self.terminate_orphans = terminate_orphans
+        self.interactive = interactive
+        self.timings = {}
+        self.wait_cancelled = threading.Event()
+        self.journal = journal or DeployJournal()
 
     def _get_running_environment(self):
         """
@@ -160,17 +766,34 @@ class AWSUtil:
         """
         if self.running_environment is None:
             environments = [
-                environment for environment in self.eb_client.describe_environments()['Environments']
+                environment for environment in self.eb_client.describe_environments(
+                    ApplicationName=self.APPLICATION_NAME,
+                )['Environments']
                 if environment['Status'] != 'Terminated'
             ]
             if len(environments) == 0:
                 self.is_first = True
                 self.swap_cname = 'eb-deploy-base'
                 self.running_environment = {'EnvironmentName': self.ENV_NAME_BLUE}
-            elif len(environments) != 1:
-                raise Exception(f'실행중인 환경이 1개가 아닙니다 (총 {len(environments)}개)')
-            else:
-                self.running_environment = environments[0]
+                return self.running_environment
+
+            # 운영 CNAME을 가진 Environment가 실행중인 환경, 나머지 blue/green은 중단된 배포가 남긴 환경
+            # (직접 만든 다른 이름의 Environment는 건드리지 않음)
+            running_environments = [
+                environment for environment in environments
+                if environment.get('CNAME', '').startswith(self.CNAME_PREFIX)
+            ]
+            if len(running_environments) != 1:
+                raise Exception(
+                    f'운영 CNAME({self.CNAME_PREFIX})을 사용하는 환경이 1개가 아닙니다 '
+                    f'(총 {len(running_environments)}개, 전체 {len(environments)}개)'
+                )
+            self.running_environment = running_environments[0]
+            self.orphan_environments = [
+                environment for environment in environments
+                if environment is not self.running_environment
+                and environment['EnvironmentName'] in (self.ENV_NAME_BLUE, self.ENV_NAME_GREEN)
+            ]
         return self.running_environment
 
     def _get_environment_names(self):
@@ -180,17 +803,139 @@ class AWSUtil:
         else:
             self.swap_environment_name = self.ENV_NAME_BLUE
 
+    def _get_solution_stack(self):
+        for solution_stack in self.eb_client.list_available_solution_stacks()['SolutionStacks']:
+            if self.PLATFORM in solution_stack:
+                return solution_stack
+        raise Exception(f'{self.PLATFORM} 플랫폼을 찾을 수 없습니다')
+
+    def _state(self):
+        return {name: getattr(self, name) for name in self.STATE_ATTRIBUTES}
+
+    def _restore(self):
+        if not self.journal.active:
+            raise Exception('재개하거나 되돌릴 배포가 없습니다')
+        for name, value in self.journal.state.items():
+            setattr(self, name, value)
+        print(f' journal: {self.journal.data["id"]} ({self.journal.data["status"]})')
+        for step in self.STEPS:
+            print(f'  - {step}: {self.journal.step_status(step) or "pending"}')
+
+    def _environment_exists(self, environment_name):
+        environments = self.eb_client.describe_environments(
+            ApplicationName=self.APPLICATION_NAME,
+            EnvironmentNames=[environment_name],
+        )['Environments']
+        return any(environment['Status'] not in ('Terminating', 'Terminated') for environment in environments)
+
+    def _environment_terminated(self, environment_name):
+        environments = self.eb_client.describe_environments(
+            ApplicationName=self.APPLICATION_NAME,
+            EnvironmentNames=[environment_name],
+        )['Environments']
+        return all(environment['Status'] == 'Terminated' for environment in environments)
+
+    def _terminate_environments(self, environment_names):
+        """
+        Environment들을 동시에 terminate하고 종료될때까지 대기
+        """
+        for environment_name in environment_names:
+            if self._environment_exists(environment_name):
+                self.eb_client.terminate_environment(EnvironmentName=environment_name)
+        self._wait_all([
+            (f'terminate {environment_name}',
+             lambda environment_name=environment_name: self._environment_terminated(environment_name), None)
+            for environment_name in environment_names
+        ])
+
+    def _terminate_orphans(self):
+        """
+        기록되지 않은 중단된 배포가 남긴 blue/green Environment 정리 (새 Environment와 이름이 겹침)
+        --terminate-orphans가 없으면 확인 후 terminate
+        """
+        if not self.orphan_environments:
+            return
+        names = [environment['EnvironmentName'] for environment in self.orphan_environments]
+        if not self.terminate_orphans:
+            answers = prompt([{
+                'type': 'confirm', 'name': 'terminate', 'default': False,
+                'message': f'중단된 배포가 남긴 Environment({", ".join(names)})를 terminate할까요?',
+            }]) if self.interactive else {}
+            if not answers.get('terminate'):
+                raise Exception(
+                    f'중단된 배포가 남긴 Environment가 있습니다 ({", ".join(names)}), '
+                    f'--terminate-orphans로 terminate하거나 직접 정리하세요'
+                )
+        print(f' - terminate orphan environments: {", ".join(names)}')
+        self._terminate_environments(names)
+
+    def _create_application_version(self, parent=None):
+        """
+        Dockerfile(ECR 이미지 사용)과 .ebextensions만 포함한 SourceBundle로 ApplicationVersion 생성
+        """
+        version_label = f'{self.swap_environment_name}-{datetime.now():%Y%m%d%H%M%S}'
+        bucket = self.eb_client.create_storage_location()['S3Bucket']
+        key = f'{self.APPLICATION_NAME}/{version_label}.zip'
+
+        bundle = io.BytesIO()
+        with zipfile.ZipFile(bundle, 'w', zipfile.ZIP_DEFLATED) as f:
+            for name in self.SOURCE_BUNDLE:
+                path = os.path.join(ROOT_DIR, name)
+                if os.path.isdir(path):
+                    for filename in sorted(os.listdir(path)):
+                        f.write(os.path.join(path, filename), os.path.join(name, filename))
+                else:
+                    f.write(path, name)
+        with TRACER.span('upload source bundle', parent=parent, bytes=len(bundle.getvalue())):
+            self.s3_client.put_object(Bucket=bucket, Key=key, Body=bundle.getvalue())
+        self.eb_client.create_application_version(
+            ApplicationName=self.APPLICATION_NAME,
+            VersionLabel=version_label,
+            SourceBundle={'S3Bucket': bucket, 'S3Key': key},
+        )
+        return version_label
+
     def _eb_create(self, sample=False, staged=False):
-        env_vars = ','.join(
-            f'{key}={value}' for key, value in {
-                'AWS_SECRETS_MANAGER_ACCESS_KEY_ID': SECRETS_MANAGER_ACCESS_KEY,
-                'AWS_SECRETS_MANAGER_SECRET_ACCESS_KEY': SECRETS_MANAGER_SECRET_KEY,
-            }.items())
-        run(f'eb create {self.swap_environment_name} '
-            f'--cname {self.swap_cname} '
-            f'--elb-type application '
-            f'--envvars {env_vars}'
-            f'{" --sample" if sample else ""}')
+        option_settings = [
+            ('aws:elasticbeanstalk:environment', 'EnvironmentType', 'LoadBalanced'),
+            ('aws:elasticbeanstalk:environment', 'LoadBalancerType', 'application'),
+            ('aws:elasticbeanstalk:environment', 'ServiceRole', self.SERVICE_ROLE),
+            ('aws:elasticbeanstalk:healthreporting:system', 'SystemType', 'enhanced'),
+            ('aws:autoscaling:launchconfiguration', 'IamInstanceProfile', self.INSTANCE_PROFILE),
+            ('aws:autoscaling:launchconfiguration', 'EC2KeyName', self.EC2_KEY_NAME),
+            ('aws:elasticbeanstalk:application:environment',
+             'AWS_SECRETS_MANAGER_ACCESS_KEY_ID', SECRETS_MANAGER_ACCESS_KEY),
+            ('aws:elasticbeanstalk:application:environment',
+             'AWS_SECRETS_MANAGER_SECRET_ACCESS_KEY', SECRETS_MANAGER_SECRET_KEY),
+            # HTTPS Listener 및 ACM (LoadBalancer SecurityGroup의 443Port Inbound는 EB가 추가)
+            ('aws:elbv2:listener:443', 'ListenerEnabled', 'true'),
+            ('aws:elbv2:listener:443', 'Protocol', 'HTTPS'),
+            ('aws:elbv2:listener:443', 'SSLCertificateArns', self.acm_arn),
+        ]
+        # resume시 이미 생성 요청된 Environment는 Ready가 될때까지 대기만 함
+        if not self._environment_exists(self.swap_environment_name):
+            params = {}
+            # solution stack 조회와 ApplicationVersion 생성(S3 업로드)은 서로 독립적이므로 동시에 실행
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                solution_stack = executor.submit(self._get_solution_stack)
+                # sample인 경우 VersionLabel없이 생성하면 EB의 Sample application이 배포됨
+                if not sample and not self.version_label:
+                    self.version_label = executor.submit(self._create_application_version, TRACER.current()).result()
+                if not sample:
+                    params['VersionLabel'] = self.version_label
+                solution_stack = solution_stack.result()
+            self.eb_client.create_environment(
+                ApplicationName=self.APPLICATION_NAME,
+                EnvironmentName=self.swap_environment_name,
+                CNAMEPrefix=self.swap_cname,
+                SolutionStackName=solution_stack,
+                OptionSettings=[
+                    {'Namespace': namespace, 'OptionName': option_name, 'Value': value}
+                    for namespace, option_name, value in option_settings
+                ],
+                **params,
+            )
+        self._wait('environment create', lambda: self._environment_status() == 'Ready', self.swap_environment_name)
 
         # eb deploy
         if sample:
@@ -208,80 +953,206 @@ class AWSUtil:
         )['EnvironmentResources']['LoadBalancers'][0]
 
         # 새로 생성한 LoadBalancer의 TargetGroup
-        swap_target_group = self.elb_client.describe_target_groups(
+        self.swap_target_group_arn = self.elb_client.describe_target_groups(
             LoadBalancerArn=swap_load_balancer['Name'],
         )['TargetGroups'][0]['TargetGroupArn']
 
-        # 새로 생성한 LoadBalancer의 SecurityGroup
-        swap_security_group_id = self.elb_client.describe_load_balancers(
-            LoadBalancerArns=[swap_load_balancer['Name']]
-        )['LoadBalancers'][0]['SecurityGroups'][0]
-
-        # 새 LoadBalancer에 HTTPS Listener추가 및 ACM추가
-        self.elb_client.create_listener(
-            LoadBalancerArn=swap_load_balancer['Name'],
-            Protocol='HTTPS',
-            Port=443,
-            Certificates=[
-                {
-                    'CertificateArn': self.acm_arn,
-                },
-            ],
-            DefaultActions=[
-                {
-                    'Type': 'forward',
-                    'TargetGroupArn': swap_target_group,
-                }
-            ]
+    def _new_events(self, environment_name, start_time):
+        """
+        start_time 이후의 Environment 이벤트 (오래된 순), 에러 이벤트가 있으면 예외
+        """
+        events = self.eb_client.describe_events(
+            EnvironmentName=environment_name,
+            StartTime=start_time,
+        )['Events']
+        events = sorted(
+            (event for event in events if event['EventDate'] > start_time),
+            key=lambda event: event['EventDate'],
         )
+        for event in events:
+            print(f'   [{environment_name}] {event["Severity"]} {event["Message"]}')
+            if event['Severity'] in ('ERROR', 'FATAL'):
+                raise Exception(f'{environment_name} 에러 이벤트: {event["Message"]}')
+        return events
 
-        # 새 LoadBalancer의 securityGroup에 443Port Inbound추가
-        self.ec2_client.authorize_security_group_ingress(
-            GroupId=swap_security_group_id,
-            IpPermissions=[
-                {
-                    'FromPort': 443,
-                    'IpProtocol': 'tcp',
-                    'IpRanges': [{'CidrIp': '0.0.0.0/0'}],
-                    'Ipv6Ranges': [{'CidrIpv6': '::/0'}],
-                    'ToPort': 443,
-                }
+    def _wait(self, name, check, environment_name=None, deadline=None, parent=None):
+        """
+        check()가 True가 될때까지 대기
+        environment_name의 새 이벤트가 발생하면 바로 다시 확인하고,
+        아니면 jitter를 포함한 exponential backoff로 간격을 늘림
+        """
+        with TRACER.span(f'wait {name}', parent=parent):
+            self._wait_until(name, check, environment_name, deadline)
+
+    def _wait_until(self, name, check, environment_name, deadline):
+        started_at = perf_counter()
+        deadline = deadline or started_at + self.WAIT_TIMEOUT
+        start_time = datetime.now(timezone.utc) - timedelta(seconds=1)
+        delay = self.WAIT_INITIAL_DELAY
+        while not check():
+            remaining = deadline - perf_counter()
+            if remaining <= 0:
+                raise Exception(f'{name} 대기시간 초과 ({perf_counter() - started_at:.0f}s)')
+            # 함께 대기중인 다른 조건이 실패하면 중단
+            if self.wait_cancelled.wait(min(remaining, delay / 2 + random.uniform(0, delay / 2))):
+                raise Exception(f'{name} 대기 취소')
+
+            events = self._new_events(environment_name, start_time) if environment_name else []
+            if events:
+                start_time = events[-1]['EventDate']
+                delay = self.WAIT_INITIAL_DELAY
+            else:
+                delay = min(delay * 2, self.WAIT_MAX_DELAY)
+        self.timings[name] = perf_counter() - started_at
+        print(f'   {name}: {self.timings[name]:.1f}s')
+
+    def _describe_environment(self, environment_name):
+        # 같은 이름으로 이전에 종료된 Environment는 제외 (blue/green은 같은 이름을 반복해서 사용)
+        environments = [
+            environment for environment in self.eb_client.describe_environments(
+                ApplicationName=self.APPLICATION_NAME,
+                EnvironmentNames=[environment_name],
+                IncludeDeleted=False,
+            )['Environments']
+            if environment['Status'] != 'Terminated'
+        ]
+        if not environments:
+            raise Exception(f'{environment_name} Environment가 없습니다')
+        return environments[0]
+
+    def _environment_status(self):
+        return self._describe_environment(self.swap_environment_name)['Status']
+
+    def _environment_ready(self, environment_name):
+        environment = self._describe_environment(environment_name)
+        return environment['Status'] == 'Ready' and environment['Health'] == 'Green'
+
+    def _targets_healthy(self, target_group_arn):
+        targets = self.elb_client.describe_target_health(
+            TargetGroupArn=target_group_arn,
+        )['TargetHealthDescriptions']
+        return bool(targets) and all(target['TargetHealth']['State'] == 'healthy' for target in targets)
+
+    def _cname_swapped(self):
+        return self.CNAME_PREFIX in self._describe_environment(self.swap_environment_name)['CNAME']
+
+    def _wait_all(self, waits):
+        """
+        (name, check, environment_name) 목록을 동시에 대기, 하나라도 실패하면 나머지도 중단
+        """
+        deadline = perf_counter() + self.WAIT_TIMEOUT
+        self.wait_cancelled.clear()
+        with ThreadPoolExecutor(max_workers=len(waits)) as executor:
+            futures = [
+                executor.submit(self._wait, name, check, environment_name, deadline, TRACER.current())
+                for name, check, environment_name in waits
             ]
-        )
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except Exception:
+                self.wait_cancelled.set()
+                raise
+
+    def _eb_wait_healthy(self):
+        """
+        새 Environment의 상태와 TargetGroup의 Target 상태를 동시에 대기
+        """
+        self._wait_all([
+            ('environment health', lambda: self._environment_ready(self.swap_environment_name),
+             self.swap_environment_name),
+            ('target health', lambda: self._targets_healthy(self.swap_target_group_arn), None),
+        ])
 
     def _eb_swap(self):
-        # CName Swap
-        self.eb_client.swap_environment_cnames(
-            SourceEnvironmentName=self.running_environment_name,
-            DestinationEnvironmentName=self.swap_environment_name,
-        )
+        # CName Swap (resume시 이미 swap된 경우 제외)
+        if not self._cname_swapped():
+            self.eb_client.swap_environment_cnames(
+                SourceEnvironmentName=self.running_environment_name,
+                DestinationEnvironmentName=self.swap_environment_name,
+            )
 
         # 새 Environment의 CNAME이 CNAME_PREFIX로 시작할때까지 기다림
-        while True:
-            cname = self.eb_client.describe_environments(
-                EnvironmentNames=[self.swap_environment_name],
-            )['Environments'][0]['CNAME']
-            sleep(5)
-            if self.CNAME_PREFIX in cname:
-                break
+        self._wait('cname swap', self._cname_swapped, self.swap_environment_name)
 
+    def _eb_terminate(self):
         # 기존 Environment terminate
-        self.eb_client.terminate_environment(
-            EnvironmentName=self.running_environment_name,
-        )
-
-    def deploy(self):
+        if self._environment_exists(self.running_environment_name):
+            self.eb_client.terminate_environment(
+                EnvironmentName=self.running_environment_name,
+            )
+
+    def _run_steps(self):
+        actions = {
+            self.STEP_CREATE: self._eb_create,
+            self.STEP_SETTINGS: self._eb_settings,
+            self.STEP_WAIT_HEALTHY: self._eb_wait_healthy,
+            self.STEP_SWAP: self._eb_swap,
+            self.STEP_TERMINATE: self._eb_terminate,
+        }
+        for step in self.STEPS:
+            if self.journal.step_status(step) == 'done':
+                print(f' - eb {step} (done)')
+                continue
+            # 첫 배포는 swap할 기존 Environment가 없음
+            if self.is_first and step in (self.STEP_SWAP, self.STEP_TERMINATE):
+                continue
+            print(f' - eb {step}')
+            try:
+                with TRACER.span(f'eb {step}'):
+                    actions[step]()
+            except Exception as e:
+                self.journal.update(step, DeployJournal.STATUS_FAILED, self._state(), error=e)
+                raise
+            self.journal.update(step, 'done', self._state())
+        self.journal.finish(DeployJournal.STATUS_FINISHED)
+
+    def deploy(self, resume=False):
         print('AWS Deploy Start')
-        self._get_running_environment()
-        self._get_environment_names()
-        print(' - eb create')
-        self._eb_create()
-        print(' - eb settings')
-        self._eb_settings()
-        if not self.is_first:
-            print(' - eb swap')
-            self._eb_swap()
+        if resume:
+            self._restore()
+        else:
+            if self.journal.active:
+                raise Exception(
+                    f'완료되지 않은 배포가 있습니다 ({self.journal.path}), --resume 또는 --rollback을 사용하세요'
+                )
+            self._get_running_environment()
+            self._get_environment_names()
+            self._terminate_orphans()
+            self.journal.start(self._state())
+        self._run_steps()
         print('AWS Deploy Finished')
+        for name, elapsed in self.timings.items():
+            print(f' - {name}: {elapsed:.1f}s')
+
+    def rollback(self):
+        """
+        journal에 기록된 배포를 되돌림
+        swap된 경우 CNAME을 다시 swap하고, 새로 생성한 Environment를 terminate
+        """
+        print('AWS Rollback Start')
+        self._restore()
+        if self.journal.step_status(self.STEP_TERMINATE) == 'done':
+            raise Exception(f'기존 Environment({self.running_environment_name})가 이미 종료되어 되돌릴 수 없습니다')
+
+        if self.journal.step_status(self.STEP_SWAP) and self._cname_swapped():
+            print(' - eb swap (restore)')
+            self.eb_client.swap_environment_cnames(
+                SourceEnvironmentName=self.swap_environment_name,
+                DestinationEnvironmentName=self.running_environment_name,
+            )
+            self._wait(
+                'cname restore',
+                lambda: self._describe_environment(self.running_environment_name)['CNAME'].startswith(
+                    self.CNAME_PREFIX
+                ),
+                self.running_environment_name,
+            )
+        if self._environment_exists(self.swap_environment_name):
+            print(f' - eb terminate {self.swap_environment_name}')
+            self._terminate_environments([self.swap_environment_name])
+        self.journal.finish(DeployJournal.STATUS_ROLLED_BACK)
+        print('AWS Rollback Finished')
 
 
 class DeployUtil:
@@ -295,19 +1166,28 @@ class DeployUtil:
     )
     ENABLE_PROJECTS_INFO_TXT_PATH = os.path.join(ROOT_DIR, 'projects.txt')
 
-    def __init__(self, ci=False):
+    def __init__(self, ci=False, clean=False):
         self.projects = []
         self.mode = None
         self.ci = ci
+        self.clean = clean
 
     def deploy(self):
+        self.pre_deploy()
+        self.config()
+        TRACER.attributes.update(mode=self.mode, projects=[project.name for project in self.projects])
         if self.mode != self.MODE_ONLY_DEPLOY:
-            self.pre_deploy()
-            self.config()
-            self.export_requirements()
-            self.export_projects()
-
-            self.docker_build()
+            with TRACER.span('export requirements'):
+                self.export_requirements()
+            with TRACER.span('export projects'):
+                self.export_projects()
+            with TRACER.span('dockerfile'):
+                self.generate_dockerfile()
+            if args.context:
+                self.write_context()
+                return
+            with TRACER.span('docker build') as span:
+                span.update(self.docker_build())
         if self.mode == self.MODE_BUILD:
             return
         if self.mode == self.MODE_RUN:
@@ -315,8 +1195,10 @@ class DeployUtil:
         elif self.mode == self.MODE_BASH:
             self.docker_bash()
         elif self.mode in (self.MODE_DEPLOY, self.MODE_ONLY_DEPLOY):
-            self.push_ecr()
-            self.eb_deploy()
+            with TRACER.span('push ecr'):
+                self.push_ecr()
+            with TRACER.span('eb deploy'):
+                self.eb_deploy()
 
     def pre_deploy(self):
         def _remove_exists_dirs():
@@ -330,7 +1212,8 @@ class DeployUtil:
             os.makedirs(ARCHIVE_DIR, exist_ok=True)
             Path(self.ENABLE_PROJECTS_INFO_TXT_PATH).touch()
 
-        _remove_exists_dirs()
+        if self.clean:
+            _remove_exists_dirs()
         _make_dirs()
 
     def config(self):
@@ -372,22 +1255,204 @@ class DeployUtil:
 
     @staticmethod
     def export_requirements():
-        os.chdir(ROOT_DIR)
-        run(f'poetry export -f requirements.txt > requirements.txt')
+        run(f'poetry export -f requirements.txt > requirements.txt', cwd=ROOT_DIR)
+
+    def prune_artifacts(self):
+        """
+        선택되지 않은 프로젝트의 빌드 결과물 삭제 (container.py는 .poetry의 목록을 기준으로 동작)
+        """
+        names = {project.name for project in self.projects}
+        for name in os.listdir(POETRY_DIR):
+            if name not in names:
+                shutil.rmtree(os.path.join(POETRY_DIR, name), ignore_errors=True)
+        # 다른 codec으로 만들어진 archive도 삭제
+        archive_paths = {project.archive_file_path for project in self.projects}
+        for filename in os.listdir(ARCHIVE_DIR):
+            path = os.path.join(ARCHIVE_DIR, filename)
+            if path != BUILD_MANIFEST_PATH and path not in archive_paths:
+                os.remove(path)
 
     def export_projects(self):
         print('Export projects requirements & archive')
-        for index, project in enumerate(self.projects, start=1):
-            project.export_requirements()
-            project.archive()
-            print(f' {index}. {project.name} ({project.requirements_path})')
+        self.prune_artifacts()
+        try:
+            with open(BUILD_MANIFEST_PATH, 'rt') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, JSONDecodeError):
+            manifest = {}
+
+        started_at = perf_counter()
+        errors = []
+        with ThreadPoolExecutor(max_workers=EXPORT_WORKERS) as executor:
+            futures = {
+                executor.submit(project.export, manifest.get(project.name), TRACER.current()): project
+                for project in self.projects
+            }
+            for index, future in enumerate(as_completed(futures), start=1):
+                project = futures[future]
+                if future.cancelled():
+                    continue
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # 하나라도 실패하면 아직 시작하지 않은 프로젝트는 취소
+                    errors.append((project, e))
+                    manifest.pop(project.name, None)
+                    for pending in futures:
+                        pending.cancel()
+                    continue
+                manifest[project.name] = result.key
+                print(f' {index}. {project.name} ({result.elapsed:.1f}s)')
+                print(f'    requirements: {"rebuilt, " + result.requirements if result.requirements else "cached"}')
+                print(f'    archive: {"rebuilt, " + result.archive if result.archive else "cached"}')
+
+        # 성공한 프로젝트의 캐시 키만 기록
+        manifest = {name: key for name, key in manifest.items() if name in {p.name for p in self.projects}}
+        with open(BUILD_MANIFEST_PATH, 'wt') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+        if errors:
+            messages = []
+            for project, e in errors:
+                output = getattr(e, 'stderr', None) or b''
+                messages.append(f' - {project.name}: {e}\n{output.decode(errors="replace").strip()}')
+            raise Exception('프로젝트 export/archive 실패\n' + '\n'.join(messages))
+        print(f' Total: {perf_counter() - started_at:.1f}s ({len(self.projects)} projects)')
 
     @staticmethod
-    def docker_build():
+    def benchmark_archive():
+        """
+        projects/의 각 프로젝트를 codec별로 archive해서 크기와 소요시간 비교
+        """
+        codecs = [codec for codec in ARCHIVE_EXTENSIONS if codec != 'zstd' or zstandard is not None]
+        projects = [Project(name) for name in sorted(os.listdir(PROJECTS_DIR)) if name[0] != '.']
+        print(f'{"project":<16}' + ''.join(f'{codec:>22}' for codec in codecs))
+        totals = {codec: [0, 0] for codec in codecs}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for project in projects:
+                row = f'{project.name:<16}'
+                for codec in codecs:
+                    started_at = perf_counter()
+                    size = project.archive(codec, path=os.path.join(tmp_dir, f'{project.name}.{codec}'))
+                    elapsed = perf_counter() - started_at
+                    totals[codec][0] += size
+                    totals[codec][1] += elapsed
+                    row += f'{size / 1024 / 1024:>12.1f}MB {elapsed:>6.2f}s'
+                print(row)
+        print(f'{"total":<16}' + ''.join(
+            f'{size / 1024 / 1024:>12.1f}MB {elapsed:>6.2f}s' for size, elapsed in totals.values()
+        ))
+
+    def venv_groups(self):
+        """
+        venv를 공유할 프로젝트 그룹 (container.py --venv-groups와 같은 기준)
+        """
+        result = run(
+            f'python3 container.py --venv-groups --projects {" ".join(project.name for project in self.projects)}',
+            cwd=ROOT_DIR, capture_output=True,
+        )
+        lines = result.stdout.decode().strip().splitlines()
+        print('Venv groups')
+        print('\n'.join(lines[:-1]))
+        return json.loads(lines[-1])
+
+    def generate_dockerfile(self):
+        """
+        의존성 layer(venv를 공유하는 그룹별)는 poetry.lock의 변경 빈도가 낮은 그룹부터,
+        소스 layer는 의존성 layer 뒤에 두어 한 프로젝트의 변경이 다른 프로젝트의 layer 캐시를 무효화하지 않도록 함
+        """
+        lock_changes = {project.name: project.lock_changes() for project in self.projects}
+        projects = sorted(self.projects, key=lambda project: (lock_changes[project.name], project.name))
+        groups = sorted(self.venv_groups(), key=lambda group: (max(lock_changes[name] for name in group), group))
+        dockerfile = DOCKERFILE_BASE
+        for group in groups:
+            for name in group:
+                dockerfile += DOCKERFILE_DEPS_COPY.format(project=name)
+            dockerfile += DOCKERFILE_DEPS.format(projects=' '.join(group))
+        dockerfile += DOCKERFILE_APP
+        for project in projects:
+            dockerfile += DOCKERFILE_SOURCE.format(
+                project=project.name,
+                archive=os.path.basename(project.archive_file_path),
+            )
+        dockerfile += DOCKERFILE_CONFIG
+
+        os.makedirs(BUILD_DIR, exist_ok=True)
+        with open(DOCKERFILE_PATH, 'wt') as f:
+            f.write(dockerfile)
+        print(f'Dockerfile: {DOCKERFILE_PATH} ({", ".join(project.name for project in projects)})')
+
+    def context_members(self):
+        """
+        build context에 포함될 (경로, context내 경로) 목록
+        Dockerfile에서 사용하는 파일만 포함 (projects/는 .archive의 archive로 대신함)
+        """
+        members = [(DOCKERFILE_PATH, 'Dockerfile')]
+        for name in CONTEXT_FILES:
+            path = os.path.join(ROOT_DIR, name)
+            if os.path.isdir(path):
+                for dirpath, dirnames, filenames in os.walk(path):
+                    dirnames[:] = [d for d in dirnames if d != '__pycache__']
+                    for filename in filenames:
+                        file_path = os.path.join(dirpath, filename)
+                        members.append((file_path, os.path.relpath(file_path, ROOT_DIR)))
+            else:
+                members.append((path, name))
+        for project in self.projects:
+            members.append((project.requirements_path, os.path.relpath(project.requirements_path, ROOT_DIR)))
+            members.append((project.archive_file_path, os.path.relpath(project.archive_file_path, ROOT_DIR)))
+        return sorted(members, key=lambda member: member[1])
+
+    def build_context(self, fileobj):
+        """
+        재현 가능한 build context (tar)를 fileobj에 기록하고 (sha256, 크기) 반환
+        """
+        writer = HashingWriter(fileobj)
+        with tarfile.open(fileobj=writer, mode='w|', format=tarfile.GNU_FORMAT) as tar:
+            for member_path, arcname in self.context_members():
+                info = normalize_tarinfo(tar.gettarinfo(member_path, arcname), CONTEXT_MTIME)
+                with open(member_path, 'rb') as member:
+                    tar.addfile(info, member)
+        return writer.hexdigest(), writer.size
+
+    def write_context(self):
+        with open(CONTEXT_PATH, 'wb') as f:
+            digest, size = self.build_context(f)
+        for _, arcname in self.context_members():
+            print(f' {arcname}')
+        print(f'Build context: {CONTEXT_PATH} ({size / 1024 / 1024:.1f}MB, sha256:{digest})')
+
+    @staticmethod
+    def docker_build_report(output):
+        """
+        BuildKit(--progress=plain) 출력에서 layer별 캐시 사용 여부와 소요시간
+        Dockerfile의 명령([stage n/m])만 대상으로 하고, 항상 실행되는 [internal]/[auth] 단계와 FROM은 제외
+        """
+        steps, cached, durations = {}, set(), {}
+        for line in output:
+            match = re.match(r'#(\d+) (\[(?:\S+ )?\d+/\d+\] (\w+).*)', line)
+            if match:
+                if match.group(3) != 'FROM':
+                    steps.setdefault(match.group(1), match.group(2))
+            elif re.match(r'#(\d+) CACHED', line):
+                cached.add(line.split()[0][1:])
+            else:
+                match = re.match(r'#(\d+) DONE ([\d.]+)s', line)
+                if match:
+                    durations[match.group(1)] = float(match.group(2))
+
+        misses = [step_id for step_id in steps if step_id not in cached]
+        print(f'Layer cache: {len(steps) - len(misses)} hit, {len(misses)} miss')
+        # 첫번째 miss가 이후 layer를 모두 다시 빌드하게 만든 원인
+        for step_id in misses:
+            print(f' - MISS {durations.get(step_id, 0):>7.1f}s {steps[step_id][:100]}')
+        return {'cache_hits': len(steps) - len(misses), 'cache_misses': len(misses)}
+
+    def docker_build(self):
         os.chdir(ROOT_DIR)
-        run('docker pull python:3.8-slim')
-        run('docker build {build_args} -t {tag} -f {dockerfile} .'.format(
-            volume=f'{VOLUME_ENVS_DIR}:/srv/envs/',
+        # build context는 stdin으로 전달 (Dockerfile은 context 내의 ./Dockerfile)
+        cmd = 'docker build {pull}--progress=plain {build_args} -t {tag} -'.format(
+            pull='--pull ' if args.pull else '',
             build_args=' '.join([
                 f'--build-arg {key}={value}'
                 for key, value in {
@@ -398,16 +1463,69 @@ class DeployUtil:
                 }.items()
             ]),
             tag=IMAGE_PRODUCTION_LOCAL,
-            dockerfile='Dockerfile.local',
+        )
+        output = []
+        context = {}
+        process = subprocess.Popen(
+            cmd, shell=True, env=dict(ENV, DOCKER_BUILDKIT='1'),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        )
+
+        def _upload():
+            # stdout을 읽는 동안 별도 thread에서 context 전송
+            started_at = perf_counter()
+            try:
+                context['digest'], context['size'] = self.build_context(process.stdin)
+            except BrokenPipeError:
+                pass
+            finally:
+                process.stdin.close()
+            context['elapsed'] = perf_counter() - started_at
+
+        uploader = threading.Thread(target=_upload)
+        uploader.start()
+        for line in io.TextIOWrapper(process.stdout, errors='replace'):
+            print(line, end='')
+            output.append(line.rstrip('\n'))
+        uploader.join()
+        if process.wait() != 0:
+            raise Exception(f'docker build 실패 (exit {process.returncode})')
+        print('Build context: {size:.1f}MB, upload {elapsed:.1f}s, sha256:{digest}'.format(
+            size=context['size'] / 1024 / 1024, elapsed=context['elapsed'], digest=context['digest'],
         ))
+        return {
+            'returncode': process.returncode,
+            'bytes': context['size'],
+            'upload': context['elapsed'],
+            **self.docker_build_report(output),
+        }
 
     @staticmethod
     def docker_run():
-        run(f'{RUN_CMD}')
+        run(f'{RUN_CMD}', check=False)
 
     @staticmethod
     def docker_bash():
-        run(f'{RUN_CMD} /bin/bash')
+        run(f'{RUN_CMD} /bin/bash', check=False)
+
+    @staticmethod
+    def history(limit=20):
+        """
+        이전 배포들의 전체/단계별 소요시간
+        """
+        try:
+            with open(DEPLOY_HISTORY_PATH, 'rt') as f:
+                deploys = [json.loads(line) for line in f if line.strip()][-limit:]
+        except FileNotFoundError:
+            deploys = []
+        if not deploys:
+            print('배포 기록이 없습니다')
+            return
+        longest = max(deploy['total'] for deploy in deploys) or 1
+        for deploy in deploys:
+            bar = '#' * max(1, round(deploy['total'] / longest * 40))
+            print(f'{deploy["id"]} {deploy["status"]:<7} {deploy["total"]:>8.1f}s {bar}')
+            print('    ' + ', '.join(f'{name} {elapsed:.1f}s' for name, elapsed in deploy['stages'].items()))
 
     @staticmethod
     def push_ecr():
@@ -417,11 +1535,25 @@ class DeployUtil:
             f'docker login --username AWS --password-stdin {IMAGE_PRODUCTION_ECR_BASE} && '
             f'docker push {IMAGE_PRODUCTION_ECR}')
 
-    @staticmethod
-    def eb_deploy():
-        AWSUtil().deploy()
+    def eb_deploy(self):
+        AWSUtil(terminate_orphans=args.terminate_orphans, interactive=not self.ci).deploy()
 
 
 if __name__ == '__main__':
-    util = DeployUtil(ci=args.ci)
-    util.deploy()
+    if args.archive_benchmark:
+        DeployUtil.benchmark_archive()
+    elif args.history:
+        DeployUtil.history()
+    else:
+        status = 'failed'
+        try:
+            if args.resume:
+                AWSUtil().deploy(resume=True)
+            elif args.rollback:
+                AWSUtil().rollback()
+            else:
+                util = DeployUtil(ci=args.ci, clean=args.clean)
+                util.deploy()
+            status = 'ok'
+        finally:
+            TRACER.finish(status)
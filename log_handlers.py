@@ -0,0 +1,126 @@
+"""
+요청 처리 thread가 디스크 I/O를 기다리지 않는 로그 handler
+
+- QueueFileHandler: 로그를 queue에 넣기만 하고, 파일 쓰기는 별도 thread(QueueListener)에서 처리
+  queue가 가득 차면 기다리지 않고 버린 개수만 기록
+  파일은 WatchedFileHandler로 열어서 container.py --rotate-logs가 파일을 옮기면 다시 열림
+- JsonFormatter: Django/celery 로그를 한 줄의 JSON으로
+- JsonAccessLogger: gunicorn access log를 한 줄의 JSON으로 (gunicorn의 access_log_format은 값을 escape하지 않음)
+
+gunicorn 설정의 pythonpath(/srv/project)로 각 프로젝트의 venv에서 import됨
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import weakref
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+
+try:
+    from gunicorn.glogging import Logger as GunicornLogger
+except ImportError:
+    GunicornLogger = None
+
+QUEUE_SIZE = 10000
+
+# listener가 실행중인 QueueFileHandler (close되면 제외)
+_HANDLERS = weakref.WeakSet()
+
+
+def _restart_after_fork():
+    # gunicorn worker처럼 fork된 프로세스에는 listener thread가 없으므로 다시 시작
+    for handler in list(_HANDLERS):
+        handler._lock = threading.Lock()
+        handler._start()
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+class BlockingStopListener(QueueListener):
+    def enqueue_sentinel(self):
+        # queue가 가득 찬 상태에서도 종료 신호는 버리지 않음
+        self.queue.put(self._sentinel)
+
+
+class QueueFileHandler(QueueHandler):
+    def __init__(self, filename, queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.file_handler = WatchedFileHandler(filename, delay=True)
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self.listener = None
+        super().__init__(queue.Queue(queue_size))
+        self._start()
+
+    def _start(self):
+        # fork 전의 queue에 남은 로그는 부모 프로세스의 listener가 씀
+        self.queue = queue.Queue(self.queue_size)
+        self.listener = BlockingStopListener(self.queue, self.file_handler)
+        self.listener.start()
+        _HANDLERS.add(self)
+
+    def enqueue(self, record):
+        if self.listener is None:
+            # 다른 dictConfig(gunicorn 이후 Django의 LOGGING 등)가 기존 handler를 모두 close해도
+            # logger에는 연결된 채로 남아있으므로 다시 시작
+            with self._lock:
+                if self.listener is None:
+                    self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def close(self):
+        # 남아있는 로그를 모두 쓴 후 종료
+        with self._lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+                _HANDLERS.discard(self)
+        self.file_handler.close()
+        super().close()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'pid': record.process,
+            'message': record.getMessage(),
+        }
+        status_code = getattr(record, 'status_code', None)
+        if status_code:
+            data['status'] = status_code
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+if GunicornLogger is not None:
+    class JsonAccessLogger(GunicornLogger):
+        def access(self, resp, req, environ, request_time):
+            atoms = self.atoms(resp, req, environ, request_time)
+            data = {
+                'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                'remote': environ.get('HTTP_X_REAL_IP') or atoms['h'],
+                'method': atoms['m'],
+                'path': atoms['U'],
+                'query': atoms['q'],
+                'status': int(atoms['s']) if str(atoms['s']).isdigit() else atoms['s'],
+                'bytes': getattr(resp, 'sent', None),
+                'request_time': request_time.total_seconds(),
+                'referer': atoms['f'],
+                'user_agent': atoms['a'],
+                'pid': atoms['p'],
+            }
+            try:
+                self.access_log.info(json.dumps(data, ensure_ascii=False))
+            except Exception:
+                self.exception('access log 기록 실패')
@@ -0,0 +1,151 @@
+"""
+Secrets Manager의 secret을 한 번만 가져와서 공유하는 캐시
+
+- 프로세스 내 memoization (TTL이 지나면 다시 가져옴)
+- 암호화된 디스크 스냅샷: 컨테이너 시작시 한 번 가져온 값을 모든 gunicorn worker가 공유
+  root만 읽을 수 있는 파일(0600)에 Fernet으로 암호화해서 저장
+  cryptography가 설치되어 있고 암호화 키가 있는 경우에만 사용 (없으면 프로세스마다 Secrets Manager에서 가져옴)
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+
+SECRETS_NAME = 'lhy'
+SECRETS_PROFILE = 'lhy-secrets-manager'
+SECRETS_REGION = 'ap-northeast-2'
+SECRETS_TTL = int(os.environ.get('SECRETS_TTL', 60 * 60))
+# 빈 문자열이면 디스크 스냅샷을 사용하지 않음
+SECRETS_SNAPSHOT_PATH = os.environ.get('SECRETS_SNAPSHOT_PATH', '/tmp/secrets.snapshot')
+
+
+def default_client():
+    import boto3
+    try:
+        session = boto3.session.Session(
+            aws_access_key_id=os.environ['AWS_SECRETS_MANAGER_ACCESS_KEY_ID'],
+            aws_secret_access_key=os.environ['AWS_SECRETS_MANAGER_SECRET_ACCESS_KEY'],
+            region_name=SECRETS_REGION,
+        )
+    except KeyError:
+        # 환경변수에 없는 경우(local), ~/.aws/credentials의 profile_name사용
+        session = boto3.session.Session(profile_name=SECRETS_PROFILE, region_name=SECRETS_REGION)
+    return session.client('secretsmanager', region_name=SECRETS_REGION)
+
+
+class SecretsSection:
+    """
+    'eb-deploy-base:production' 형태의 경로에 해당하는 secret의 일부
+    접근할때마다 캐시를 거치므로 TTL이 지나면 갱신된 값을 반환
+    """
+
+    def __init__(self, cache, path):
+        self.cache = cache
+        self.path = path
+
+    def _value(self):
+        value = self.cache.get()
+        for key in self.path.split(':'):
+            value = value[key]
+        return value
+
+    def __getitem__(self, key):
+        return self._value()[key]
+
+    def get(self, key, default=None):
+        return self._value().get(key, default)
+
+    def __repr__(self):
+        return f'SecretsSection({self.cache.secret_id}:{self.path})'
+
+
+class SecretsCache:
+    def __init__(self, secret_id=SECRETS_NAME, ttl=SECRETS_TTL, snapshot_path=SECRETS_SNAPSHOT_PATH,
+                 snapshot_key=None, client_factory=default_client):
+        self.secret_id = secret_id
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        # 로컬 테스트시에는 get_secret_value만 구현한 대체 client를 사용
+        self.client_factory = client_factory
+        snapshot_key = snapshot_key or os.environ.get('AWS_SECRETS_MANAGER_SECRET_ACCESS_KEY')
+        if Fernet and snapshot_path and snapshot_key:
+            self.fernet = Fernet(base64.urlsafe_b64encode(hashlib.sha256(snapshot_key.encode()).digest()))
+        else:
+            self.fernet = None
+
+        self._lock = threading.Lock()
+        self._value = None
+        self._expires_at = 0
+        self.stats = {
+            'api_calls': 0,
+            'api_seconds': 0.0,
+            'snapshot_hits': 0,
+            'memory_hits': 0,
+        }
+
+    def _fetch(self):
+        started_at = time.perf_counter()
+        response = self.client_factory().get_secret_value(SecretId=self.secret_id)
+        self.stats['api_calls'] += 1
+        self.stats['api_seconds'] += time.perf_counter() - started_at
+        return json.loads(response['SecretString'])
+
+    def _read_snapshot(self):
+        if not self.fernet:
+            return None
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                # Fernet token의 생성시간 기준으로 TTL이 지난 스냅샷은 무시 (키가 다르거나 변조된 경우도 무시)
+                return json.loads(self.fernet.decrypt(f.read(), ttl=self.ttl))
+        except (FileNotFoundError, InvalidToken):
+            return None
+
+    def _write_snapshot(self, value):
+        if not self.fernet:
+            return
+        tmp_path = f'{self.snapshot_path}.{os.getpid()}'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.fernet.encrypt(json.dumps(value).encode()))
+        os.replace(tmp_path, self.snapshot_path)
+
+    def get(self):
+        """
+        전체 secret (메모리 → 디스크 스냅샷 → Secrets Manager 순서로 확인)
+        """
+        with self._lock:
+            if self._value is not None and time.monotonic() < self._expires_at:
+                self.stats['memory_hits'] += 1
+                return self._value
+            value = self._read_snapshot()
+            if value is not None:
+                self.stats['snapshot_hits'] += 1
+            else:
+                value = self._fetch()
+                self._write_snapshot(value)
+            self._value = value
+            self._expires_at = time.monotonic() + self.ttl
+            return value
+
+    def refresh(self):
+        """
+        캐시와 관계없이 Secrets Manager에서 다시 가져와서 스냅샷 갱신
+        """
+        with self._lock:
+            self._value = self._fetch()
+            self._expires_at = time.monotonic() + self.ttl
+            self._write_snapshot(self._value)
+            return self._value
+
+    def section(self, path):
+        return SecretsSection(self, path)
+
+
+SECRETS_CACHE = SecretsCache()
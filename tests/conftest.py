@@ -0,0 +1,49 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+
+def import_script(name):
+    """
+    import시에 argparse를 실행하는 스크립트(container.py, deploy.py)를 인자 없이 import
+    """
+    argv = sys.argv
+    sys.argv = [f'{name}.py']
+    try:
+        return importlib.import_module(name)
+    finally:
+        sys.argv = argv
+
+
+@pytest.fixture(scope='session')
+def container():
+    return import_script('container')
+
+
+@pytest.fixture(scope='session')
+def deploy():
+    pytest.importorskip('boto3')
+    pytest.importorskip('PyInquirer')
+    # boto3 Session을 만들때 ~/.aws/credentials의 profile을 찾지 않도록
+    for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY',
+                 'AWS_SECRETS_MANAGER_ACCESS_KEY_ID', 'AWS_SECRETS_MANAGER_SECRET_ACCESS_KEY'):
+        os.environ.setdefault(name, 'test')
+    return import_script('deploy')
+
+
+@pytest.fixture
+def make_aws(deploy, monkeypatch, tmp_path):
+    monkeypatch.setattr(deploy.AWSUtil, 'WAIT_INITIAL_DELAY', 0.01)
+    monkeypatch.setattr(deploy.AWSUtil, 'WAIT_MAX_DELAY', 0.02)
+
+    def _make(fake):
+        return deploy.AWSUtil(
+            eb_client=fake, elb_client=fake, s3_client=fake, acm_arn='arn:aws:acm:test',
+            journal=deploy.DeployJournal(str(tmp_path / 'journal.json')),
+        )
+    return _make
@@ -0,0 +1,115 @@
+"""
+deploy.AWSUtil 테스트용 Elastic Beanstalk, ELBv2, S3 client
+
+- Environment마다 기록된 (Status, Health) 목록을 describe할때마다 하나씩 진행 (마지막 상태는 유지)
+- faults: {메서드 이름: 횟수}, 해당 메서드를 호출하면 횟수만큼 FaultInjected 발생
+"""
+from datetime import datetime, timezone
+
+
+class FaultInjected(Exception):
+    pass
+
+
+class FakeAWS:
+    LAUNCH = [('Launching', 'Grey'), ('Ready', 'Grey'), ('Ready', 'Green')]
+    TERMINATE = [('Terminating', 'Grey'), ('Terminated', 'Grey')]
+
+    def __init__(self, target_health=('healthy',), faults=None):
+        self.environments = []
+        self.events = []
+        self.target_health = list(target_health)
+        self.faults = dict(faults or {})
+        self.calls = []
+
+    def add_environment(self, name, cname='', status='Ready', health='Green', sequence=()):
+        environment = {
+            'EnvironmentName': name, 'CNAME': cname, 'Status': status, 'Health': health,
+            'sequence': list(sequence),
+        }
+        self.environments.append(environment)
+        return environment
+
+    def add_event(self, name, message, severity='INFO'):
+        self.events.append({
+            'EnvironmentName': name, 'Message': message, 'Severity': severity,
+            'EventDate': datetime.now(timezone.utc),
+        })
+
+    def live(self, name):
+        return next(
+            environment for environment in self.environments
+            if environment['EnvironmentName'] == name and environment['Status'] != 'Terminated'
+        )
+
+    def _call(self, name, **kwargs):
+        self.calls.append((name, kwargs))
+        if self.faults.get(name):
+            self.faults[name] -= 1
+            raise FaultInjected(name)
+
+    # elasticbeanstalk
+    def describe_environments(self, ApplicationName=None, EnvironmentNames=None, IncludeDeleted=True):
+        self._call('describe_environments', EnvironmentNames=EnvironmentNames)
+        environments = []
+        for environment in self.environments:
+            if EnvironmentNames and environment['EnvironmentName'] not in EnvironmentNames:
+                continue
+            if environment['sequence']:
+                environment['Status'], environment['Health'] = environment['sequence'].pop(0)
+            if not IncludeDeleted and environment['Status'] == 'Terminated':
+                continue
+            environments.append({key: value for key, value in environment.items() if key != 'sequence'})
+        return {'Environments': environments}
+
+    def describe_events(self, EnvironmentName, StartTime):
+        self._call('describe_events', EnvironmentName=EnvironmentName)
+        return {'Events': [
+            event for event in self.events
+            if event['EnvironmentName'] == EnvironmentName and event['EventDate'] >= StartTime
+        ]}
+
+    def list_available_solution_stacks(self):
+        self._call('list_available_solution_stacks')
+        return {'SolutionStacks': ['64bit Amazon Linux 2018.03 v2.14.3 running Docker 19.03.6-ce']}
+
+    def create_storage_location(self):
+        self._call('create_storage_location')
+        return {'S3Bucket': 'elasticbeanstalk-bucket'}
+
+    def create_application_version(self, **kwargs):
+        self._call('create_application_version', **kwargs)
+
+    def create_environment(self, EnvironmentName, CNAMEPrefix, **kwargs):
+        self._call('create_environment', EnvironmentName=EnvironmentName)
+        self.add_environment(
+            EnvironmentName, f'{CNAMEPrefix}.ap-northeast-2.elasticbeanstalk.com', 'Launching', 'Grey',
+            sequence=self.LAUNCH,
+        )
+
+    def terminate_environment(self, EnvironmentName):
+        self._call('terminate_environment', EnvironmentName=EnvironmentName)
+        self.live(EnvironmentName)['sequence'] = list(self.TERMINATE)
+
+    def swap_environment_cnames(self, SourceEnvironmentName, DestinationEnvironmentName):
+        self._call('swap_environment_cnames')
+        source, destination = self.live(SourceEnvironmentName), self.live(DestinationEnvironmentName)
+        source['CNAME'], destination['CNAME'] = destination['CNAME'], source['CNAME']
+
+    def describe_environment_resources(self, EnvironmentName):
+        self._call('describe_environment_resources', EnvironmentName=EnvironmentName)
+        return {'EnvironmentResources': {'LoadBalancers': [{'Name': f'arn:loadbalancer/{EnvironmentName}'}]}}
+
+    # elbv2
+    def describe_target_groups(self, LoadBalancerArn):
+        self._call('describe_target_groups')
+        return {'TargetGroups': [{'TargetGroupArn': f'{LoadBalancerArn}/targetgroup'}]}
+
+    def describe_target_health(self, TargetGroupArn):
+        self._call('describe_target_health')
+        state = self.target_health.pop(0) if len(self.target_health) > 1 else self.target_health[0]
+        return {'TargetHealthDescriptions': [{'TargetHealth': {'State': state}}]}
+
+    # s3
+    def put_object(self, **kwargs):
+        self._call('put_object', Key=kwargs['Key'])
@@ -0,0 +1,55 @@
+import subprocess
+import tarfile
+
+import pytest
+
+
+@pytest.fixture
+def project(deploy, monkeypatch, tmp_path):
+    monkeypatch.setattr(deploy, 'PROJECTS_DIR', str(tmp_path / 'projects'))
+    repo = tmp_path / 'projects' / 'lhy'
+    for path, content in {
+        '.gitignore': '.venv/\n.env\ndb.sqlite3\n.media/\n',
+        '.dockerignore': '/docs\n',
+        'app/manage.py': 'print()\n',
+        'app/config/settings.py': 'DEBUG = False\n',
+        'app/config/__pycache__/settings.cpython-38.pyc': 'x',
+        'docs/index.md': '# docs\n',
+        'node_modules/package/index.js': '',
+        '.venv/bin/python': '',
+        '.env': 'SECRET=1\n',
+        'db.sqlite3': 'x',
+        '.media/upload.png': 'x',
+        'untracked.py': 'x = 1\n',
+    }.items():
+        (repo / path).parent.mkdir(parents=True, exist_ok=True)
+        (repo / path).write_text(content)
+    subprocess.run('git init -q && git add .gitignore .dockerignore app docs && '
+                   'git -c user.name=test -c user.email=test@test commit -qm init',
+                   shell=True, cwd=repo, check=True)
+    return deploy.Project('lhy')
+
+
+def test_members_follow_gitignore_and_dockerignore(project):
+    names = [arcname for path, arcname in project.archive_members()]
+    assert names == [
+        'lhy',
+        'lhy/.dockerignore',
+        'lhy/.gitignore',
+        'lhy/app',
+        'lhy/app/config',
+        'lhy/app/config/settings.py',
+        'lhy/app/manage.py',
+        'lhy/untracked.py',
+    ]
+
+
+@pytest.mark.parametrize('codec', ['gzip', 'tar'])
+def test_archive_reproducible(project, tmp_path, codec):
+    first, second = tmp_path / f'first.{codec}', tmp_path / f'second.{codec}'
+    project.archive(codec, str(first))
+    (tmp_path / 'projects' / 'lhy' / 'app' / 'manage.py').touch()
+    project.archive(codec, str(second))
+    assert first.read_bytes() == second.read_bytes()
+    with tarfile.open(first) as tar:
+        assert 'lhy/app/manage.py' in tar.getnames()
@@ -0,0 +1,133 @@
+import gzip
+import sqlite3
+import sys
+import threading
+import types
+
+import pytest
+
+
+class FakeMultipartUpload:
+    """
+    S3 multipart upload처럼 마지막 part를 제외하고 min_part_size 이상만 허용
+    """
+
+    def __init__(self, min_part_size=0, fail_at=None):
+        self.min_part_size = min_part_size
+        self.fail_at = fail_at
+        self.parts = {}
+        self.completed = None
+        self.aborted = False
+
+    def upload_part(self, number, data):
+        if number == self.fail_at:
+            raise OSError('upload failed')
+        self.parts[number] = data
+        return f'etag-{number}'
+
+    def complete(self, etags):
+        numbers = [number for number, etag in etags]
+        assert numbers == sorted(self.parts) == list(range(1, len(numbers) + 1))
+        assert all(len(self.parts[number]) >= self.min_part_size for number in numbers[:-1])
+        self.completed = b''.join(self.parts[number] for number in numbers)
+
+    def abort(self):
+        self.aborted = True
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / 'db.sqlite3'
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)')
+    connection.executemany('INSERT INTO item (name) VALUES (?)', [(f'item-{i:06d}' * 10,) for i in range(5000)])
+    connection.commit()
+    connection.close()
+    return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(path)}
+
+
+def restore(dump):
+    connection = sqlite3.connect(':memory:')
+    connection.executescript(gzip.decompress(dump).decode())
+    return connection.execute('SELECT COUNT(*), MAX(name) FROM item').fetchone()
+
+
+def test_stream_sqlite_dump_in_parts(container, monkeypatch, database):
+    monkeypatch.setattr(container, 'DB_BACKUP_READ_SIZE', 16 * 1024)
+    upload = FakeMultipartUpload(min_part_size=4096)
+    stats = container.stream_upload(container.sqlite_dump(database), upload, part_size=4096, workers=2)
+    assert stats['parts'] == len(upload.parts) > 1
+    assert stats['compressed'] == len(upload.completed)
+    assert restore(upload.completed) == (5000, 'item-004999' * 10)
+
+
+def test_failed_part_aborts_upload(container, database):
+    upload = FakeMultipartUpload(fail_at=2)
+    with pytest.raises(OSError):
+        container.stream_upload(container.sqlite_dump(database), upload, part_size=1024, workers=2)
+    assert upload.aborted
+    assert upload.completed is None
+
+
+def test_local_target_and_unchanged_skip(container, monkeypatch, tmp_path, database):
+    monkeypatch.setattr(container, 'project_database', lambda project: database)
+    target = f'file://{tmp_path / "backup"}'
+    result = container.backup_project('lhy', target, {})
+    assert not result['skipped']
+    assert restore((tmp_path / 'backup' / result['key']).read_bytes())[0] == 5000
+
+    state = {'lhy': {'fingerprint': result['fingerprint'], 'key': result['key']}}
+    assert container.backup_project('lhy', target, state)['skipped']
+
+    connection = sqlite3.connect(database['NAME'])
+    connection.execute("INSERT INTO item (name) VALUES ('new')")
+    connection.commit()
+    connection.close()
+    assert not container.backup_project('lhy', target, state)['skipped']
+
+
+class FakeS3:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.uploads = {}
+        self.objects = {}
+        self.created = 0
+
+    def create_multipart_upload(self, Bucket, Key):
+        with self.lock:
+            self.created += 1
+            upload_id = str(self.created)
+            self.uploads[upload_id] = {}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {'ETag': f'etag-{PartNumber}'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.objects[f'{Bucket}/{Key}'] = b''.join(parts[part['PartNumber']] for part in MultipartUpload['Parts'])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+
+
+def test_s3_client_created_once(container, monkeypatch, tmp_path, database):
+    s3, sessions = FakeS3(), []
+
+    def _session():
+        sessions.append(threading.current_thread().name)
+        return types.SimpleNamespace(client=lambda name: s3)
+
+    boto3 = types.SimpleNamespace(session=types.SimpleNamespace(Session=_session))
+    monkeypatch.setitem(sys.modules, 'boto3', boto3)
+    monkeypatch.setattr(container.args, 'projects', ['a', 'b', 'c'])
+    monkeypatch.setattr(container, 'project_config', lambda project: {'backup_target': 's3://bucket/db'})
+    monkeypatch.setattr(container, 'project_database', lambda project: database)
+    monkeypatch.setattr(container, 'DB_BACKUP_STATE_PATH', str(tmp_path / 'backup.json'))
+    container.db_backup()
+
+    # worker thread가 아닌 곳에서 한 번만 생성
+    assert sessions == [threading.current_thread().name]
+    assert sorted(key.split('/')[2] for key in s3.objects) == ['a', 'b', 'c']
+    assert all(restore(dump)[0] == 5000 for dump in s3.objects.values())
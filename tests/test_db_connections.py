@@ -0,0 +1,99 @@
+import os
+import sys
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+from conftest import ROOT_DIR
+
+django = pytest.importorskip('django')
+pytest.importorskip('celery')
+sys.path.insert(0, os.path.join(ROOT_DIR, 'app'))
+
+
+def query_view(request):
+    from django.db import connection
+    from django.http import HttpResponse
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    return HttpResponse('ok')
+
+
+urlpatterns = []
+
+
+@pytest.fixture(scope='module')
+def handler(tmp_path_factory):
+    """
+    SQLite를 DB 대신 사용하는 최소한의 Django (요청 시작/종료 signal은 gunicorn과 같은 WSGIHandler 경로)
+    """
+    from django.conf import settings
+    from django.urls import path
+
+    from config.db import configure_databases, install_connection_stats
+
+    urlpatterns[:] = [path('', query_view)]
+    settings.configure(
+        DEBUG=False,
+        ALLOWED_HOSTS=['*'],
+        ROOT_URLCONF=__name__,
+        INSTALLED_APPS=[],
+        MIDDLEWARE=[],
+        DATABASES=configure_databases(
+            {'default': {'ENGINE': 'django.db.backends.sqlite3',
+                         'NAME': str(tmp_path_factory.mktemp('db') / 'db.sqlite3')}},
+            pool=False,
+        ),
+    )
+    django.setup()
+    install_connection_stats()
+    from django.core.handlers.wsgi import WSGIHandler
+    return WSGIHandler()
+
+
+@pytest.fixture
+def stats(handler):
+    from django.db import connections
+
+    from config.db import CONNECTION_STATS
+
+    connections.close_all()
+    CONNECTION_STATS.opened = CONNECTION_STATS.reused = 0
+    settings_dict = connections['default'].settings_dict
+    conn_max_age = settings_dict['CONN_MAX_AGE']
+    yield CONNECTION_STATS
+    settings_dict['CONN_MAX_AGE'] = conn_max_age
+    connections.close_all()
+
+
+def request(handler):
+    environ = {}
+    setup_testing_defaults(environ)
+    response = handler(environ, lambda status, headers: None)
+    body = b''.join(response)
+    # 응답을 닫을때 request_finished (close_old_connections)
+    response.close()
+    return body
+
+
+def test_configured_for_persistent_connections(handler):
+    from django.db import connections
+
+    assert connections['default'].settings_dict['CONN_MAX_AGE'] == 600
+    assert connections['default'].settings_dict['CONN_HEALTH_CHECKS'] is True
+
+
+def test_persistent_connection_reused(handler, stats):
+    for _ in range(3):
+        assert request(handler) == b'ok'
+    assert stats.as_dict() == {'opened': 1, 'reused': 2}
+
+
+def test_connection_per_request_without_max_age(handler, stats):
+    from django.db import connections
+
+    connections['default'].settings_dict['CONN_MAX_AGE'] = 0
+    for _ in range(3):
+        assert request(handler) == b'ok'
+    assert stats.as_dict() == {'opened': 3, 'reused': 0}
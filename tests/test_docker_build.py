@@ -0,0 +1,61 @@
+CACHED_BUILD = '''#1 [internal] load build definition from Dockerfile
+#1 transferring dockerfile: 2.31kB done
+#1 DONE 0.0s
+#2 [internal] load .dockerignore
+#2 DONE 0.0s
+#3 resolve image config for docker.io/docker/dockerfile:1
+#3 DONE 1.1s
+#4 [internal] load metadata for docker.io/library/python:3.8-slim
+#4 DONE 0.9s
+#5 [auth] library/python:pull token for registry-1.docker.io
+#5 DONE 0.0s
+#6 [internal] load build context
+#6 transferring context: 1.20MB 0.1s done
+#6 DONE 0.1s
+#7 [base 1/8] FROM docker.io/library/python:3.8-slim@sha256:0123
+#7 DONE 0.0s
+#8 [base 2/8] RUN apt -y update
+#8 CACHED
+#9 [deps 1/3] COPY .poetry/lhy/requirements.txt /srv/project/.poetry/lhy/requirements.txt
+#9 CACHED
+#10 [deps 2/3] RUN --mount=type=cache,target=/root/.cache/pip ./venvs.py --wheelhouse --share-venvs --projects lhy
+#10 CACHED
+'''
+
+
+def test_build_report_ignores_internal_steps(deploy):
+    report = deploy.DeployUtil.docker_build_report(CACHED_BUILD.splitlines())
+    assert report == {'cache_hits': 3, 'cache_misses': 0}
+
+
+def test_build_report_counts_misses(deploy):
+    output = CACHED_BUILD.replace('#10 CACHED', '#10 DONE 42.0s').splitlines()
+    report = deploy.DeployUtil.docker_build_report(output)
+    assert report == {'cache_hits': 2, 'cache_misses': 1}
+
+
+def test_container_copied_after_deps(deploy):
+    # container.py의 변경이 venv layer를 다시 빌드하지 않도록
+    assert 'container.py' not in deploy.DOCKERFILE_BASE + deploy.DOCKERFILE_DEPS_COPY + deploy.DOCKERFILE_DEPS
+    assert 'COPY        container.py' in deploy.DOCKERFILE_APP
+
+
+def test_dockerfile_commands_traced_under_stage(deploy, monkeypatch):
+    # generate_dockerfile의 git/venv-groups 명령이 history의 최상위 단계('run')로 기록되지 않도록
+    tracer = deploy.Tracer()
+    monkeypatch.setattr(deploy, 'TRACER', tracer)
+    monkeypatch.setattr(deploy.args, 'context', True)
+    util = deploy.DeployUtil()
+    for name in ('pre_deploy', 'config', 'export_requirements', 'export_projects', 'write_context'):
+        monkeypatch.setattr(util, name, lambda: None)
+    monkeypatch.setattr(util, 'generate_dockerfile', lambda: deploy.run('true'))
+    util.deploy()
+    roots = [span['name'] for span in tracer.spans if span['parent'] is None]
+    assert roots == ['export requirements', 'export projects', 'dockerfile']
+
+
+def test_envs_deduped_in_own_stage(deploy):
+    # hardlink는 한 layer 안에서만 유지되므로 envs stage에서 합친 결과를 app에 복사
+    assert 'RUN         ./venvs.py --dedupe' in deploy.DOCKERFILE_APP
+    assert 'COPY        --from=envs /srv/envs /srv/envs' in deploy.DOCKERFILE_APP
+    assert 'FROM        deps AS app' not in deploy.DOCKERFILE_APP
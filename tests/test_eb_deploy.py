@@ -0,0 +1,110 @@
+import pytest
+
+from fake_aws import FakeAWS, FaultInjected
+
+BLUE, GREEN = 'eb-deploy-base-blue', 'eb-deploy-base-green'
+PRODUCTION_CNAME = 'eb-deploy-base.ap-northeast-2.elasticbeanstalk.com'
+
+
+@pytest.fixture
+def fake():
+    fake = FakeAWS()
+    fake.add_environment(BLUE, PRODUCTION_CNAME)
+    return fake
+
+
+def called(fake, name):
+    return [kwargs for call, kwargs in fake.calls if call == name]
+
+
+def test_deploy(make_aws, fake):
+    aws = make_aws(fake)
+    aws.deploy()
+    assert aws.journal.data['status'] == 'finished'
+    assert fake.live(GREEN)['CNAME'] == PRODUCTION_CNAME
+    assert [kwargs['EnvironmentName'] for kwargs in called(fake, 'terminate_environment')] == [BLUE]
+
+
+def test_resume_after_fault(make_aws, fake):
+    fake.faults['swap_environment_cnames'] = 1
+    aws = make_aws(fake)
+    with pytest.raises(FaultInjected):
+        aws.deploy()
+    assert aws.journal.data['status'] == 'failed'
+    assert aws.journal.step_status('swap') == 'failed'
+
+    resumed = make_aws(fake)
+    resumed.deploy(resume=True)
+    assert resumed.journal.data['status'] == 'finished'
+    assert fake.live(GREEN)['CNAME'] == PRODUCTION_CNAME
+    # 이미 완료된 단계는 다시 실행하지 않음
+    assert len(called(fake, 'create_environment')) == 1
+    assert len(called(fake, 'create_application_version')) == 1
+
+
+def test_rollback_after_fault(make_aws, fake):
+    fake.faults['terminate_environment'] = 1
+    aws = make_aws(fake)
+    with pytest.raises(FaultInjected):
+        aws.deploy()
+    assert aws.journal.step_status('swap') == 'done'
+
+    rolled_back = make_aws(fake)
+    rolled_back.rollback()
+    assert rolled_back.journal.data['status'] == 'rolled_back'
+    assert fake.live(BLUE)['CNAME'] == PRODUCTION_CNAME
+    assert not any(environment['Status'] != 'Terminated' for environment in fake.environments
+                   if environment['EnvironmentName'] == GREEN)
+
+
+def test_unfinished_deploy_blocks_new_deploy(make_aws, fake):
+    fake.faults['describe_target_groups'] = 1
+    with pytest.raises(FaultInjected):
+        make_aws(fake).deploy()
+    with pytest.raises(Exception, match='--resume'):
+        make_aws(fake).deploy()
+
+
+def test_orphans_need_confirmation(make_aws, fake):
+    fake.add_environment(GREEN, 'eb-deploy-base-swap.ap-northeast-2.elasticbeanstalk.com')
+    fake.add_environment('eb-deploy-base-staging', 'eb-deploy-base-staging.ap-northeast-2.elasticbeanstalk.com')
+
+    aws = make_aws(fake)
+    aws.interactive = False
+    with pytest.raises(Exception, match='--terminate-orphans'):
+        aws.deploy()
+    assert not called(fake, 'terminate_environment')
+
+    aws = make_aws(fake)
+    aws.terminate_orphans = True
+    aws.deploy()
+    terminated = [kwargs['EnvironmentName'] for kwargs in called(fake, 'terminate_environment')]
+    # 중단된 배포의 green, swap 후 기존 blue만 종료하고 직접 만든 Environment는 유지
+    assert terminated == [GREEN, BLUE]
+    assert fake.live('eb-deploy-base-staging')['Status'] == 'Ready'
+    assert fake.live(GREEN)['CNAME'] == PRODUCTION_CNAME
+
+
+@pytest.mark.parametrize('ci, terminate_orphans', [(False, False), (True, True)])
+def test_deploy_util_passes_options(deploy, monkeypatch, ci, terminate_orphans):
+    created = []
+
+    class StubAWSUtil:
+        def __init__(self, **kwargs):
+            created.append(kwargs)
+
+        def deploy(self):
+            created.append('deploy')
+
+    monkeypatch.setattr(deploy, 'AWSUtil', StubAWSUtil)
+    monkeypatch.setattr(deploy, 'TRACER', deploy.Tracer())
+    monkeypatch.setattr(deploy.args, 'terminate_orphans', terminate_orphans)
+    util = deploy.DeployUtil(ci=ci)
+    for name in ('pre_deploy', 'push_ecr'):
+        monkeypatch.setattr(util, name, lambda: None)
+
+    def _config():
+        util.mode = util.MODE_ONLY_DEPLOY
+    monkeypatch.setattr(util, 'config', _config)
+    util.deploy()
+    assert created == [{'terminate_orphans': terminate_orphans, 'interactive': not ci}, 'deploy']
@@ -0,0 +1,56 @@
+import pytest
+
+from fake_aws import FakeAWS
+
+GREEN = 'eb-deploy-base-green'
+
+
+def make_swap(make_aws, fake):
+    aws = make_aws(fake)
+    aws.swap_environment_name = GREEN
+    aws.swap_target_group_arn = 'arn:targetgroup'
+    return aws
+
+
+def test_wait_healthy_replays_states(make_aws):
+    fake = FakeAWS(target_health=['initial', 'unhealthy', 'healthy'])
+    fake.add_environment(GREEN, sequence=FakeAWS.LAUNCH)
+    fake.add_event(GREEN, 'createEnvironment is starting.')
+    aws = make_swap(make_aws, fake)
+
+    aws._eb_wait_healthy()
+    assert set(aws.timings) == {'environment health', 'target health'}
+    assert fake.live(GREEN)['Health'] == 'Green'
+    assert sum(1 for name, kwargs in fake.calls if name == 'describe_target_health') == 3
+
+
+def test_terminated_environment_with_same_name_ignored(make_aws):
+    fake = FakeAWS()
+    fake.add_environment(GREEN, 'eb-deploy-base-swap.old', 'Terminated', 'Grey')
+    fake.add_environment(GREEN, 'eb-deploy-base.new', 'Ready', 'Green')
+    aws = make_swap(make_aws, fake)
+
+    assert aws._environment_ready(GREEN)
+    assert aws._cname_swapped()
+
+
+def test_wait_timeout(make_aws, monkeypatch):
+    fake = FakeAWS()
+    fake.add_environment(GREEN, status='Launching', health='Grey')
+    aws = make_swap(make_aws, fake)
+    monkeypatch.setattr(aws, 'WAIT_TIMEOUT', 0.2)
+
+    with pytest.raises(Exception, match='대기시간 초과'):
+        aws._wait('environment create', lambda: aws._environment_status() == 'Ready', GREEN)
+
+
+def test_error_event_stops_all_waits(make_aws):
+    fake = FakeAWS(target_health=['initial'])
+    fake.add_environment(GREEN, status='Launching', health='Grey')
+    fake.add_event(GREEN, 'Failed to pull Docker image', severity='ERROR')
+    aws = make_swap(make_aws, fake)
+
+    with pytest.raises(Exception, match='Failed to pull Docker image'):
+        aws._eb_wait_healthy()
+    assert aws.wait_cancelled.is_set()
+    assert 'target health' not in aws.timings
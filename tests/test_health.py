@@ -0,0 +1,52 @@
+import json
+import os
+import sys
+
+import pytest
+
+from conftest import ROOT_DIR
+
+pytest.importorskip('django')
+pytest.importorskip('celery')
+sys.path.insert(0, os.path.join(ROOT_DIR, 'app'))
+
+
+def request(application, path):
+    status = []
+    body = b''.join(application({'PATH_INFO': path}, lambda s, headers: status.append(s)))
+    return status[0], body
+
+
+def test_liveness_answered_before_django():
+    from config.health import HealthCheckMiddleware
+
+    calls = []
+
+    def django(environ, start_response):
+        calls.append(environ['PATH_INFO'])
+        start_response('302 Found', [])
+        return []
+
+    application = HealthCheckMiddleware(django)
+    assert request(application, '/health/') == ('200 OK', b'{"status": "ok"}')
+    assert request(application, '/admin/') == ('302 Found', b'')
+    assert calls == ['/admin/']
+
+
+def test_readiness_cached_within_staleness(monkeypatch):
+    from config import health
+
+    checks = []
+    monkeypatch.setattr(health, 'CHECKS', {'database': lambda: checks.append(1)})
+    monkeypatch.setattr('config.cache.cache_stats', lambda: {})
+    application = health.HealthCheckMiddleware(None, staleness=60)
+    for _ in range(3):
+        status, body = request(application, '/health/ready/')
+        assert status == '200 OK'
+        assert json.loads(body)['checks']['database']['status'] == 'ok'
+    assert checks == [1]
+
+    application.readiness_checked_at -= 60
+    monkeypatch.setattr(health, 'CHECKS', {'database': lambda: 1 / 0})
+    status, body = request(application, '/health/ready/')
+    assert status == '503 Service Unavailable'
@@ -0,0 +1,64 @@
+import logging
+import logging.config
+import os
+
+import log_handlers
+from log_handlers import QueueFileHandler
+
+
+def config(path):
+    return {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {'message': {'format': '%(message)s'}},
+        'handlers': {
+            'file': {'class': 'log_handlers.QueueFileHandler', 'filename': str(path), 'formatter': 'message'},
+        },
+        'loggers': {
+            'test.access': {'level': 'INFO', 'handlers': ['file'], 'propagate': False},
+        },
+    }
+
+
+def read_lines(path):
+    return path.read_text().splitlines() if path.exists() else []
+
+
+def test_logs_after_other_dict_config(tmp_path):
+    access_path, django_path = tmp_path / 'access.log', tmp_path / 'django.log'
+    # gunicorn의 logconfig_dict 이후 Django가 LOGGING으로 다시 dictConfig
+    logging.config.dictConfig(config(access_path))
+    handler = logging.getLogger('test.access').handlers[0]
+    logging.config.dictConfig(dict(config(django_path), loggers={}))
+    assert handler.listener is None
+
+    logging.getLogger('test.access').info('after reconfigure')
+    handler.close()
+    assert read_lines(access_path) == ['after reconfigure']
+
+
+def test_forked_child_writes(tmp_path):
+    path = tmp_path / 'fork.log'
+    handler = QueueFileHandler(str(path))
+    logger = logging.getLogger('test.fork')
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        pid = os.fork()
+        if pid == 0:
+            logger.warning('child')
+            handler.close()
+            os._exit(0)
+        os.waitpid(pid, 0)
+        logger.warning('parent')
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+    assert sorted(read_lines(path)) == ['child', 'parent']
+
+
+def test_closed_handlers_not_restarted_after_fork(tmp_path):
+    handler = QueueFileHandler(str(tmp_path / 'closed.log'))
+    assert handler in log_handlers._HANDLERS
+    handler.close()
+    assert handler not in log_handlers._HANDLERS
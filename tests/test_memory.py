@@ -0,0 +1,30 @@
+import mmap
+import os
+
+import pytest
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/smaps'), reason='/proc/<pid>/smaps')
+def test_venv_memory_from_mapped_files(container, monkeypatch, tmp_path):
+    envs = tmp_path / 'envs'
+    monkeypatch.setattr(container, 'ENVS_DIR', str(envs))
+    native = envs / 'shared-a' / 'lib' / 'native.so'
+    native.parent.mkdir(parents=True)
+    native.write_bytes(b'\1' * 1024 * 1024)
+    with open(native, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        # page를 읽어야 RSS에 포함됨
+        assert sum(mapped[offset] for offset in range(0, len(mapped), mmap.PAGESIZE)) == len(mapped) // mmap.PAGESIZE
+        memory = container.venv_memory(os.getpid())
+    assert list(memory) == ['shared-a']
+    assert memory['shared-a']['Rss'] == pytest.approx(1, abs=0.1)
+
+
+def test_shared_venv_memory(container):
+    processes = [
+        ('a', {'shared-ab': {'Rss': 40, 'Pss': 10}}),
+        ('a', {'shared-ab': {'Rss': 30, 'Pss': 10}}),
+        ('b', {'shared-ab': {'Rss': 20, 'Pss': 10}}),
+        ('c', {'env-c': {'Rss': 50, 'Pss': 50}}),
+    ]
+    # 공유 venv는 PSS의 합, 프로젝트마다 venv가 있으면 적어도 a 40MB + b 20MB
+    assert container.shared_venv_memory(processes) == {'shared-ab': (['a', 'b'], 30, 60)}
@@ -0,0 +1,68 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+CONFIG = {
+    'workers': 2,
+    'threads': 2,
+    'client_max_body_size': '128M',
+    'proxy_buffer_size': '16k',
+    'proxy_buffers': '16 16k',
+    'proxy_busy_buffers_size': '32k',
+}
+
+
+class DummyApp(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    connections = set()
+
+    def do_GET(self):
+        self.connections.add(self.client_address)
+        body = b'x' * 1024 if self.headers['Host'] == 'bench.localhost' else b''
+        self.send_response(200 if body else 404)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    DummyApp.connections = set()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), DummyApp)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def test_load_test_reuses_connections(container, server):
+    address, port = server
+    result = container.load_test(address, port, 'bench.localhost', 200, concurrency=4)
+    assert result['requests'] == 200
+    assert result['rps'] > 0
+    assert 0 < result['p50'] <= result['p99']
+    assert len(DummyApp.connections) == 4
+
+
+def test_load_test_fails_on_error_status(container, server):
+    address, port = server
+    with pytest.raises(Exception, match='404'):
+        container.load_test(address, port, 'other.localhost', 10, concurrency=2)
+
+
+def test_benchmark_conf_keepalive(container):
+    conf = container.nginx_benchmark_conf(CONFIG, 'nginx-benchmark')
+    assert 'server unix:/tmp/nginx-benchmark.sock' in conf
+    assert 'keepalive 4;' in conf
+    assert 'server_name nginx-benchmark.localhost;' in conf
+
+    conf = container.nginx_benchmark_conf(CONFIG, 'nginx-benchmark-close', keepalive=False)
+    assert 'keepalive 4;' not in conf
+    assert 'keepalive_timeout' not in conf
+    assert 'proxy_pass          http://nginx-benchmark-close;' in conf
@@ -0,0 +1,85 @@
+import json
+import os
+import stat
+
+import pytest
+
+import secrets_cache
+from secrets_cache import SecretsCache
+
+SECRET = {'eb-deploy-base': {'base': {'SECRET_KEY': 'secret'}}}
+
+
+class FakeSecretsManager:
+    def __init__(self, value=SECRET):
+        self.value = value
+        self.calls = 0
+
+    def get_secret_value(self, SecretId):
+        self.calls += 1
+        return {'SecretString': json.dumps(self.value)}
+
+
+def make_cache(tmp_path, client, **kwargs):
+    kwargs.setdefault('snapshot_key', 'key')
+    return SecretsCache(
+        snapshot_path=str(tmp_path / 'secrets.snapshot'),
+        client_factory=lambda: client,
+        **kwargs,
+    )
+
+
+def test_memoized_in_process(tmp_path):
+    client = FakeSecretsManager()
+    cache = SecretsCache(snapshot_path='', client_factory=lambda: client)
+    section = cache.section('eb-deploy-base:base')
+    assert section['SECRET_KEY'] == 'secret'
+    assert section.get('MISSING') is None
+    assert client.calls == 1
+    assert cache.stats['memory_hits'] == 1
+
+
+def test_snapshot_shared_between_processes(tmp_path):
+    pytest.importorskip('cryptography')
+    client = FakeSecretsManager()
+    make_cache(tmp_path, client).refresh()
+    assert stat.S_IMODE(os.stat(tmp_path / 'secrets.snapshot').st_mode) == 0o600
+
+    # 새 worker 프로세스와 같은 조건
+    worker = make_cache(tmp_path, client)
+    assert worker.get() == SECRET
+    assert client.calls == 1
+    assert worker.stats['snapshot_hits'] == 1
+
+
+def test_snapshot_encrypted(tmp_path):
+    pytest.importorskip('cryptography')
+    make_cache(tmp_path, FakeSecretsManager()).refresh()
+    assert b'secret' not in (tmp_path / 'secrets.snapshot').read_bytes()
+
+
+def test_snapshot_rejected_when_tampered_or_expired(tmp_path):
+    pytest.importorskip('cryptography')
+    client = FakeSecretsManager()
+    make_cache(tmp_path, client).refresh()
+    path = tmp_path / 'secrets.snapshot'
+    token = path.read_bytes()
+
+    path.write_bytes(token[:-8] + (b'A' if token[-8:-7] != b'A' else b'B') + token[-7:])
+    assert make_cache(tmp_path, client).get() == SECRET
+    assert client.calls == 2
+
+    assert make_cache(tmp_path, client, snapshot_key='other').get() == SECRET
+    assert client.calls == 3
+
+    assert make_cache(tmp_path, client, ttl=0).get() == SECRET
+    assert client.calls == 4
+
+
+def test_no_snapshot_without_cryptography(tmp_path, monkeypatch):
+    monkeypatch.setattr(secrets_cache, 'Fernet', None)
+    client = FakeSecretsManager()
+    make_cache(tmp_path, client).refresh()
+    assert not (tmp_path / 'secrets.snapshot').exists()
+    assert make_cache(tmp_path, client).get() == SECRET
+    assert client.calls == 2
@@ -0,0 +1,116 @@
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+STYLE = 'body { color: #333; margin: 0; padding: 0; }\n' * 40
+SCRIPT = 'console.log("static benchmark");\n' * 40
+
+
+class FakeNginx(BaseHTTPRequestHandler):
+    """
+    nginx.project.conf의 /static/ (gzip_static, nginx.settings.conf의 $static_cache_control)
+    """
+    protocol_version = 'HTTP/1.1'
+    static_root = None
+
+    def do_GET(self):
+        path = os.path.join(self.static_root, self.path[len('/static/'):])
+        headers = {}
+        if 'gzip' in self.headers.get('Accept-Encoding', '') and os.path.exists(path + '.gz'):
+            path += '.gz'
+            headers['Content-Encoding'] = 'gzip'
+        with open(path, 'rb') as f:
+            body = f.read()
+        if re.search(r'\.[0-9a-f]{12}\.[^/.]+$', self.path):
+            headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            headers['Cache-Control'] = 'public, max-age=3600'
+        self.send_response(200)
+        for name, value in dict(headers, **{'Content-Length': str(len(body))}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def static_root(container, tmp_path):
+    paths = {}
+    for name, content in {'css/style.css': STYLE, 'js/app.js': SCRIPT, 'images/logo.png': 'png' * 100}.items():
+        base, extension = os.path.splitext(name)
+        paths[name] = f'{base}.0123456789ab{extension}'
+        for path in (name, paths[name]):
+            (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / path).write_text(content)
+    (tmp_path / 'staticfiles.json').write_text(json.dumps({'paths': paths, 'version': '1.0'}))
+    container.compress_static(str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def nginx(static_root):
+    handler = type('Handler', (FakeNginx,), {'static_root': str(static_root)})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def test_static_benchmark(container, static_root, nginx):
+    address, port = nginx
+    result = container.measure_static(str(static_root), 'lhy.localhost', address, port)
+    raw = len(STYLE) + len(SCRIPT) + 300
+    assert result['files'] == 3
+    assert result['before'] == {'bytes': raw, 'repeat_requests': 3}
+    # css, js는 미리 압축한 .gz, png는 그대로
+    assert 300 < result['after']['bytes'] < raw / 4
+    assert result['after']['repeat_requests'] == 0
+    assert dict(result['after']['encodings']) == {'gzip': 2, 'identity': 1}
+
+
+def test_brotli_only_with_nginx_module(container, static_root, monkeypatch):
+    # nginx가 brotli_static을 지원하지 않으면 .br은 제공되지 않으므로 만들지 않음
+    assert not list(static_root.glob('**/*.br'))
+    assert (static_root / 'css' / 'style.css.gz').exists()
+
+    config = {'workers': 1, 'threads': 1, 'client_max_body_size': '128M', 'proxy_buffer_size': '16k',
+              'proxy_buffers': '16 16k', 'proxy_busy_buffers_size': '32k'}
+    monkeypatch.setattr(container, 'nginx_brotli', lambda: False)
+    assert 'brotli_static' not in container.nginx_benchmark_conf(config, 'bench')
+    monkeypatch.setattr(container, 'nginx_brotli', lambda: True)
+    assert 'brotli_static           on;' in container.nginx_benchmark_conf(config, 'bench')
+
+
+def test_static_hash_includes_settings(container, monkeypatch, tmp_path):
+    project = tmp_path / 'lhy'
+    for path, content in {
+        'requirements.txt': 'django==3.2\n',
+        'app/config/settings/base.py': "STATIC_URL = '/static/'\n",
+        'app/config/settings/production.py': 'from .base import *\n',
+        'app/config/static/css/style.css': STYLE,
+        'app/config/views.py': 'x = 1\n',
+    }.items():
+        (project / path).parent.mkdir(parents=True, exist_ok=True)
+        (project / path).write_text(content)
+    monkeypatch.setattr(container, 'requirements_path', lambda name: str(project / 'requirements.txt'))
+
+    def source_hash():
+        return container.static_source_hash('lhy', str(project))
+
+    original = source_hash()
+
+    (project / 'app/config/views.py').write_text('x = 2\n')
+    assert source_hash() == original
+    # settings만 바뀌어도 collectstatic 결과가 달라질 수 있음
+    (project / 'app/config/settings/production.py').write_text(
+        "from .base import *\nSTATICFILES_STORAGE = 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'\n"
+    )
+    assert source_hash() != original
@@ -0,0 +1,116 @@
+import base64
+import hashlib
+import os
+import subprocess
+import zipfile
+
+import pytest
+
+import venvs
+
+
+def build_wheel(directory, name, version):
+    """
+    index 없이 설치할 수 있는 최소한의 pure python wheel
+    """
+    dist_info = f'{name}-{version}.dist-info'
+    files = {
+        f'{name}/__init__.py': f'VERSION = {version!r}\n',
+        f'{dist_info}/METADATA': f'Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n',
+        f'{dist_info}/WHEEL': 'Wheel-Version: 1.0\nGenerator: test\nRoot-Is-Purelib: true\nTag: py3-none-any\n',
+    }
+    record = []
+    for path, content in files.items():
+        digest = base64.urlsafe_b64encode(hashlib.sha256(content.encode()).digest()).rstrip(b'=').decode()
+        record.append(f'{path},sha256={digest},{len(content)}')
+    files[f'{dist_info}/RECORD'] = '\n'.join(record + [f'{dist_info}/RECORD,,']) + '\n'
+    path = os.path.join(directory, f'{name}-{version}-py3-none-any.whl')
+    with zipfile.ZipFile(path, 'w') as wheel:
+        for name, content in files.items():
+            wheel.writestr(name, content)
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@pytest.fixture
+def seeded(monkeypatch, tmp_path):
+    """
+    wheelhouse에 미리 넣어둔 wheel만으로 설치 (--offline)
+    """
+    wheelhouse = tmp_path / 'wheelhouse'
+    wheelhouse.mkdir()
+    hashes = {
+        (name, version): build_wheel(str(wheelhouse), name, version)
+        for name, version in (('tinycore', '1.0'), ('tinyextra', '2.0'), ('tinyextra', '3.0'))
+    }
+    monkeypatch.setattr(venvs, 'POETRY_DIR', str(tmp_path / 'poetry'))
+    monkeypatch.setattr(venvs, 'WHEELHOUSE_DIR', str(wheelhouse))
+    monkeypatch.setattr(venvs, 'ENVS_DIR', str(tmp_path / 'envs'))
+
+    def _project(project, *pins):
+        path = tmp_path / 'poetry' / project / 'requirements.txt'
+        path.parent.mkdir(parents=True)
+        path.write_text(''.join(
+            f'{name}=={version} \\\n    --hash=sha256:{hashes[(name, version)]}\n' for name, version in pins
+        ))
+    return _project
+
+
+def site_version(path, module):
+    result = subprocess.run(
+        [os.path.join(path, 'bin', 'python3'), '-c', f'import {module}; print({module}.VERSION)'],
+        capture_output=True, check=True,
+    )
+    return result.stdout.decode().strip()
+
+
+def test_offline_install_from_seeded_wheelhouse(seeded):
+    seeded('a', ('tinycore', '1.0'), ('tinyextra', '2.0'))
+    seeded('b', ('tinycore', '1.0'), ('tinyextra', '3.0'))
+    venvs.install(['a', 'b'], offline=True)
+
+    assert site_version(venvs.venv_path('a'), 'tinyextra') == '2.0'
+    assert site_version(venvs.venv_path('b'), 'tinyextra') == '3.0'
+    # 버전이 다른 패키지는 별도의 wheelhouse layer로 빌드
+    assert sorted(os.listdir(venvs.WHEELHOUSE_DIR)) == [
+        'requirements-0.txt', 'requirements-1.txt', 'requirements-a.txt', 'requirements-b.txt',
+        'tinycore-1.0-py3-none-any.whl', 'tinyextra-2.0-py3-none-any.whl', 'tinyextra-3.0-py3-none-any.whl',
+    ]
+
+
+def test_shared_venv_links_projects(seeded):
+    seeded('a', ('tinycore', '1.0'), ('tinyextra', '2.0'))
+    seeded('b', ('tinycore', '1.0'))
+    venvs.install(['a', 'b'], offline=True, share=True)
+
+    shared = venvs.shared_venv_path(['a', 'b'])
+    assert os.path.realpath(venvs.venv_path('a')) == shared
+    assert os.path.realpath(venvs.venv_path('b')) == shared
+    assert site_version(venvs.venv_path('b'), 'tinyextra') == '2.0'
+
+
+def test_shared_venv_refuses_conflicting_pins(seeded):
+    seeded('a', ('tinyextra', '2.0'))
+    seeded('b', ('tinyextra', '3.0'))
+    with pytest.raises(Exception, match='tinyextra'):
+        venvs.install(['a', 'b'], offline=True, share=True)
+    assert not os.path.exists(venvs.ENVS_DIR)
+
+
+def test_dedupe_links_identical_files(monkeypatch, tmp_path):
+    envs = tmp_path / 'envs'
+    monkeypatch.setattr(venvs, 'ENVS_DIR', str(envs))
+    monkeypatch.setattr(venvs, 'ENVS_STORE_DIR', str(envs / '.store'))
+    for name, extra in (('env-a', 'a'), ('shared-b', 'b')):
+        site_packages = envs / name / 'lib' / 'python3.8' / 'site-packages'
+        site_packages.mkdir(parents=True)
+        (site_packages / 'native.so').write_bytes(b'\0' * 4096)
+        (site_packages / 'module.py').write_text(extra * 100)
+    # 공유 venv에 대한 symlink는 같은 파일을 두번 세지 않도록 제외
+    os.symlink(envs / 'shared-b', envs / 'env-b')
+
+    assert venvs.dedupe_envs() == 4096
+    a, b = (envs / name / 'lib' / 'python3.8' / 'site-packages' for name in ('env-a', 'shared-b'))
+    assert os.stat(a / 'native.so').st_ino == os.stat(b / 'native.so').st_ino
+    assert os.stat(a / 'module.py').st_ino != os.stat(b / 'module.py').st_ino
+    assert not (envs / '.store').exists()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+"""
+프로젝트별 venv 설치 (이미지의 의존성 layer에서 실행)
+의존성 layer의 캐시 키에 포함되므로 container.py와 분리해서, 설치와 관계없는 변경이 venv layer를 다시 빌드하지 않도록 함
+"""
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import stat
+import subprocess
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from time import perf_counter
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+POETRY_DIR = os.path.join(ROOT_DIR, '.poetry')
+WHEELHOUSE_DIR = os.path.join(ROOT_DIR, '.wheelhouse')
+ENVS_DIR = os.path.join(os.sep, 'srv', 'envs')
+ENVS_STORE_DIR = os.path.join(ENVS_DIR, '.store')
+
+# 동시에 처리할 최대 프로젝트 수
+PROJECT_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def run(cmd, **kwargs):
+    return subprocess.run(cmd, shell=True, **kwargs)
+
+
+def run_projects(func, projects, workers=PROJECT_WORKERS):
+    """
+    프로젝트별 작업을 동시에 실행, 하나라도 실패하면 남은 작업은 취소하고 에러를 모아서 raise
+    """
+    results, errors = {}, []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(func, project): project for project in projects}
+        for future in as_completed(futures):
+            project = futures[future]
+            if future.cancelled():
+                continue
+            try:
+                results[project] = future.result()
+            except Exception as e:
+                errors.append((project, e))
+                for pending in futures:
+                    pending.cancel()
+    if errors:
+        messages = []
+        for project, e in errors:
+            output = getattr(e, 'stderr', None) or b''
+            messages.append(f' - {project}: {e}\n{output.decode(errors="replace").strip()}')
+        raise Exception('프로젝트 작업 실패\n' + '\n'.join(messages))
+    return results
+
+
+def read_requirements(path):
+    """
+    requirements.txt의 요구사항 목록 (줄 이어쓰기는 한 줄로, 주석/빈 줄 제외)
+    """
+    requirements, buffer = [], ''
+    with open(path, 'rt') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if line.endswith('\\'):
+                buffer += line[:-1] + ' '
+                continue
+            line = ' '.join((buffer + line).split())
+            buffer = ''
+            if line and not line.startswith('#'):
+                requirements.append(line)
+    return requirements
+
+
+def requirement_name(requirement):
+    """
+    정규화된 패키지 이름 (PEP 503)
+    """
+    match = re.match(r'[A-Za-z0-9][A-Za-z0-9._-]*', requirement)
+    return re.sub(r'[-_.]+', '-', match.group()).lower() if match else requirement
+
+
+def strip_hashes(requirement):
+    return re.sub(r'\s+--hash=\S+', '', requirement)
+
+
+def requirements_path(project):
+    return os.path.join(POETRY_DIR, project, 'requirements.txt')
+
+
+def venv_path(project):
+    return os.path.join(ENVS_DIR, f'env-{project}')
+
+
+def shared_venv_path(group):
+    return os.path.join(ENVS_DIR, f'shared-{group[0]}')
+
+
+def requirement_pins(project):
+    """
+    {패키지 이름: 요구사항(hash 포함)}
+    """
+    return {
+        requirement_name(requirement): requirement
+        for requirement in read_requirements(requirements_path(project))
+        if not requirement.startswith('-')
+    }
+
+
+def pin_conflicts(projects):
+    """
+    프로젝트간에 버전이 다른 패키지 목록
+    """
+    versions = defaultdict(set)
+    for project in projects:
+        for name, requirement in requirement_pins(project).items():
+            versions[name].add(strip_hashes(requirement))
+    return sorted(name for name, pins in versions.items() if len(pins) > 1)
+
+
+def build_wheelhouse(projects, offline=False):
+    """
+    전체 프로젝트 requirements의 합집합을 한 번에 wheel로 빌드/다운로드
+    같은 패키지의 서로 다른 버전은 pip가 한 번에 처리할 수 없으므로 별도의 layer로 나눔
+    (poetry export 결과는 하위 의존성까지 모두 고정되어 있으므로 --no-deps)
+    """
+    options, layers = [], []
+    for project in projects:
+        for requirement in read_requirements(requirements_path(project)):
+            if requirement.startswith('-'):
+                if requirement not in options:
+                    options.append(requirement)
+                continue
+            name = requirement_name(requirement)
+            if any(layer.get(name) == requirement for layer in layers):
+                continue
+            for layer in layers:
+                if name not in layer:
+                    layer[name] = requirement
+                    break
+            else:
+                layers.append({name: requirement})
+
+    os.makedirs(WHEELHOUSE_DIR, exist_ok=True)
+    print(f'Build wheelhouse ({sum(len(layer) for layer in layers)} requirements, {len(layers)} layers)')
+    for index, layer in enumerate(layers):
+        layer_path = os.path.join(WHEELHOUSE_DIR, f'requirements-{index}.txt')
+        with open(layer_path, 'wt') as f:
+            f.write('\n'.join(options + list(layer.values())) + '\n')
+        run(f'python3 -m pip wheel --no-deps'
+            f' --wheel-dir {WHEELHOUSE_DIR} --find-links {WHEELHOUSE_DIR}'
+            f'{" --no-index" if offline else ""}'
+            f' -r {layer_path}', check=True)
+
+
+def install_project(group, wheelhouse=False):
+    """
+    group(프로젝트 목록)의 venv 설치, 여러 프로젝트인 경우 requirements의 합집합을 설치한
+    공유 venv를 만들고 각 프로젝트의 venv 경로를 symlink로 연결
+    """
+    started_at = perf_counter()
+    path = venv_path(group[0]) if len(group) == 1 else shared_venv_path(group)
+    options, pins = [], {}
+    for project in group:
+        for requirement in read_requirements(requirements_path(project)):
+            if requirement.startswith('-'):
+                if requirement not in options:
+                    options.append(requirement)
+            else:
+                pins.setdefault(requirement_name(requirement), requirement)
+
+    run(f'python3 -m venv {path}', check=True, capture_output=True)
+    requirements_file = os.path.join(WHEELHOUSE_DIR if wheelhouse else '/tmp', f'requirements-{group[0]}.txt')
+    os.makedirs(os.path.dirname(requirements_file), exist_ok=True)
+    with open(requirements_file, 'wt') as f:
+        if wheelhouse:
+            # wheelhouse의 wheel은 build_wheelhouse에서 hash 검증을 마쳤고,
+            # sdist로부터 빌드된 wheel은 index의 hash와 다르므로 hash를 제외한 requirements로 설치
+            f.write('\n'.join(options + [strip_hashes(requirement) for requirement in pins.values()]) + '\n')
+        else:
+            f.write('\n'.join(options + list(pins.values())) + '\n')
+    if wheelhouse:
+        run(f'{path}/bin/pip3 install --no-index --find-links {WHEELHOUSE_DIR} -r {requirements_file}',
+            check=True, capture_output=True)
+    else:
+        run(f'{path}/bin/pip3 install -r {requirements_file}', check=True, capture_output=True)
+
+    if len(group) > 1:
+        for project in group:
+            project_path = venv_path(project)
+            if os.path.islink(project_path):
+                os.unlink(project_path)
+            elif os.path.exists(project_path):
+                shutil.rmtree(project_path)
+            os.symlink(path, project_path)
+    return perf_counter() - started_at
+
+
+def venv_size(path):
+    """
+    (전체 크기, 공유 라이브러리(.so) 크기)
+    """
+    total, libraries = 0, 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for filename in filenames:
+            st = os.lstat(os.path.join(dirpath, filename))
+            if stat.S_ISREG(st.st_mode):
+                total += st.st_size
+                if '.so' in filename:
+                    libraries += st.st_size
+    return total, libraries
+
+
+def install(projects, wheelhouse=False, offline=False, share=False):
+    if wheelhouse or offline:
+        build_wheelhouse(projects, offline=offline)
+    if share:
+        # 그룹은 projects.json이 있는 곳(deploy.py)에서 결정하고, 여기서는 충돌 여부만 확인
+        conflicts = pin_conflicts(projects)
+        if conflicts:
+            raise Exception(f'venv를 공유할 수 없습니다 (버전이 다른 패키지: {", ".join(conflicts)})')
+        groups = [projects]
+    else:
+        groups = [[project] for project in projects]
+    print('Install projects venv')
+    results = run_projects(
+        lambda group: install_project(list(group), wheelhouse=wheelhouse or offline),
+        [tuple(group) for group in groups],
+    )
+    for group, elapsed in sorted(results.items()):
+        if len(group) == 1:
+            print(f' - {group[0]} ({elapsed:.1f}s, {venv_path(group[0])})')
+            continue
+        # 공유하지 않았다면 프로젝트마다 비슷한 크기의 venv가 있었을 것으로 추정
+        total, libraries = venv_size(shared_venv_path(group))
+        print(f' - {", ".join(group)} ({elapsed:.1f}s, {shared_venv_path(group)}) '
+              f'~{total * (len(group) - 1) / 1024 / 1024:.0f}MB disk saved, '
+              f'{libraries / 1024 / 1024:.0f}MB native libraries (memory: ./container.py --measure)')
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dedupe_envs():
+    """
+    ENVS_DIR의 venv(공유 venv에 대한 symlink 제외)에서 내용이 같은 파일을 하나의 inode에 대한 hardlink로 교체
+    (이미지 크기 감소, 같은 .so를 여러 프로세스가 같은 inode로 공유)
+    그룹별 layer에서는 layer간 hardlink가 유지되지 않으므로, 모든 venv를 한 stage(envs)에 모은 후 실행하고
+    이미지에는 COPY --from으로 결과만 복사
+    """
+    started_at = perf_counter()
+    candidates = defaultdict(list)
+    for name in sorted(os.listdir(ENVS_DIR)):
+        path = os.path.join(ENVS_DIR, name)
+        if os.path.islink(path) or path == ENVS_STORE_DIR:
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                st = os.lstat(file_path)
+                if stat.S_ISREG(st.st_mode) and st.st_size > 0:
+                    candidates[(st.st_size, st.st_mode)].append(file_path)
+
+    linked_files, saved_bytes = 0, 0
+    for (size, mode), paths in candidates.items():
+        if len(paths) < 2:
+            continue
+        duplicates = defaultdict(list)
+        for path in paths:
+            duplicates[file_digest(path)].append(path)
+        for digest, paths in duplicates.items():
+            if len(paths) < 2:
+                continue
+            store_path = os.path.join(ENVS_STORE_DIR, digest[:2], digest)
+            if not os.path.exists(store_path):
+                os.makedirs(os.path.dirname(store_path), exist_ok=True)
+                os.link(paths[0], store_path)
+            store_inode = os.stat(store_path).st_ino
+
+            replaced_inodes = set()
+            for path in paths:
+                inode = os.stat(path).st_ino
+                if inode == store_inode:
+                    continue
+                tmp_path = f'{path}.dedupe'
+                os.link(store_path, tmp_path)
+                os.replace(tmp_path, path)
+                replaced_inodes.add(inode)
+                linked_files += 1
+            saved_bytes += size * len(replaced_inodes)
+    # venv의 파일끼리 hardlink로 연결되어 있으므로 store는 필요 없음
+    shutil.rmtree(ENVS_STORE_DIR, ignore_errors=True)
+
+    print(f'Dedupe venvs: {linked_files} files linked, '
+          f'{saved_bytes / 1024 / 1024:.1f}MB saved ({perf_counter() - started_at:.1f}s)')
+    return saved_bytes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--wheelhouse', action='store_true', help='공용 wheelhouse를 만든 후 venv 설치')
+    parser.add_argument('--offline', action='store_true', help='index없이 wheelhouse에 있는 wheel만 사용')
+    parser.add_argument('--share-venvs', action='store_true',
+                        help='대상 프로젝트를 하나의 venv에 설치 (container.py --venv-groups의 그룹 단위)')
+    parser.add_argument('--dedupe', action='store_true', help='설치 대신 venv간 동일한 파일을 hardlink로 공유')
+    parser.add_argument('--projects', nargs='+', help='대상 프로젝트 (기본값: .poetry의 전체 프로젝트)')
+    args = parser.parse_args()
+    if args.dedupe:
+        dedupe_envs()
+    else:
+        install(
+            args.projects or sorted(os.listdir(POETRY_DIR)),
+            wheelhouse=args.wheelhouse, offline=args.offline, share=args.share_venvs,
+        )